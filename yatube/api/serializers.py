@@ -0,0 +1,104 @@
+"""
+Representation of models in the JSON API.
+
+A resource maps every field name to the columns it is read from and
+a getter. Sparse fieldsets (``?fields=id,text``) load only the columns
+of the requested fields and join only the tables they come from.
+"""
+
+
+class InvalidFields(Exception):
+    pass
+
+
+def date(value):
+    return value.isoformat()
+
+
+class Resource:
+    """
+    Fields of a model, ``keys`` are columns loaded for any fieldset,
+    e.g. the ones keyset pagination orders by.
+    """
+
+    def __init__(self, fields, keys=('pub_date',)):
+        self.fields = fields
+        self.keys = keys
+
+    def names(self, requested=None):
+        """Requested field names, all fields when none are requested."""
+        if not requested:
+            return list(self.fields)
+        names = list(dict.fromkeys(
+            name.strip() for name in requested.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise InvalidFields(unknown)
+        return names
+
+    def columns(self, names):
+        columns = set(self.keys)
+        for name in names:
+            columns.update(self.fields[name][0])
+        return columns
+
+    def queryset(self, queryset, names):
+        """Queryset reading just the columns of the fields."""
+        columns = self.columns(names)
+        related = {
+            column.split('__')[0] for column in columns if '__' in column
+        }
+        if related:
+            # Without arguments select_related follows every relation
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+    def serialize(self, obj, names):
+        return {name: self.fields[name][1](obj) for name in names}
+
+
+post_resource = Resource({
+    'id': ((), lambda post: post.pk),
+    'text': (('text',), lambda post: post.text),
+    'pub_date': (('pub_date',), lambda post: date(post.pub_date)),
+    'author': (('author__username',), lambda post: post.author.username),
+    'group': (
+        ('group__slug',), lambda post: post.group and post.group.slug
+    ),
+    'image': (
+        ('image',), lambda post: post.image.url if post.image else None
+    ),
+    'likes': (('likes',), lambda post: post.likes),
+    'comments_count': (('comments_count',), lambda post: post.comments_count),
+})
+
+comment_resource = Resource({
+    'id': ((), lambda comment: comment.pk),
+    'text': (('text',), lambda comment: comment.text),
+    'pub_date': (('pub_date',), lambda comment: date(comment.pub_date)),
+    'author': (
+        ('author__username',), lambda comment: comment.author.username
+    ),
+    'post': (('post',), lambda comment: comment.post_id),
+})
+
+group_resource = Resource({
+    'id': ((), lambda group: group.pk),
+    'title': (('title',), lambda group: group.title),
+    'slug': (('slug',), lambda group: group.slug),
+    'description': (('description',), lambda group: group.description),
+    'pub_date': (('pub_date',), lambda group: date(group.pub_date)),
+})
+
+# Counters come from the cached author statistics set by the view
+profile_resource = Resource({
+    'id': ((), lambda user: user.pk),
+    'username': (('username',), lambda user: user.username),
+    'first_name': (('first_name',), lambda user: user.first_name),
+    'last_name': (('last_name',), lambda user: user.last_name),
+    'posts_count': ((), lambda user: user.author_stats.posts_count),
+    'followers_count': ((), lambda user: user.author_stats.followers_count),
+    'following_count': ((), lambda user: user.author_stats.following_count),
+    'likes_count': ((), lambda user: user.author_stats.likes_count),
+}, keys=())
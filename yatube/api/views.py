@@ -0,0 +1,166 @@
+import json
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_safe
+
+from api.serializers import (
+    InvalidFields, comment_resource, group_resource, post_resource,
+    profile_resource
+)
+from core.conditional import versioned_page
+from core.paginator import KeysetPaginator
+from posts.models import Comment, Group, Post, User
+from posts.stats import get_stats
+from posts.views import (
+    group_namespaces, index_namespaces, post_namespaces, profile_namespaces
+)
+
+EXPORT_FORMAT = 'ndjson'
+JSON_PARAMS = {'ensure_ascii': False}
+
+
+def error(status, detail):
+    return JsonResponse(
+        {'detail': detail}, status=status, json_dumps_params=JSON_PARAMS
+    )
+
+
+def api_view(view):
+    """Read-only endpoint answering errors in JSON."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return error(HTTPStatus.NOT_FOUND, 'Не найдено.')
+        except InvalidFields as exc:
+            return error(
+                HTTPStatus.BAD_REQUEST,
+                'Неизвестные поля: ' + ', '.join(exc.args[0])
+            )
+    return wrapper
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        return settings.API_PAGE_SIZE
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def export(queryset, resource, names):
+    """
+    Stream every row as a line of JSON, reading rows in chunks
+    instead of loading the whole result.
+    """
+    # The body is sent after the middleware, route the reads now
+    queryset = queryset.using(queryset.db).order_by('-pub_date', '-pk')
+    rows = queryset.iterator(chunk_size=settings.API_EXPORT_CHUNK_SIZE)
+    lines = (
+        json.dumps(resource.serialize(obj, names), **JSON_PARAMS) + '\n'
+        for obj in rows
+    )
+    return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+
+def list_response(request, resource, queryset):
+    """Keyset page of the queryset, or all of it in export mode."""
+    names = resource.names(request.GET.get('fields'))
+    queryset = resource.queryset(queryset, names)
+    if request.GET.get('format') == EXPORT_FORMAT:
+        return export(queryset, resource, names)
+    page_obj = KeysetPaginator(queryset, page_size(request)).get_page(
+        request.GET.get('cursor')
+    )
+    return JsonResponse({
+        'results': [resource.serialize(obj, names) for obj in page_obj],
+        'next_cursor': page_obj.next_cursor,
+        'previous_cursor': page_obj.previous_cursor,
+    }, json_dumps_params=JSON_PARAMS)
+
+
+def get_detail(request, resource, queryset, **lookup):
+    """Object with the requested fields and the names of the fields."""
+    names = resource.names(request.GET.get('fields'))
+    obj = get_object_or_404(resource.queryset(queryset, names), **lookup)
+    return obj, names
+
+
+@api_view
+@versioned_page(index_namespaces)
+def posts(request):
+    return list_response(request, post_resource, Post.objects.all())
+
+
+@api_view
+@versioned_page(post_namespaces)
+def post_detail(request, post_id):
+    post, names = get_detail(
+        request, post_resource, Post.objects.all(), pk=post_id
+    )
+    return JsonResponse(
+        post_resource.serialize(post, names), json_dumps_params=JSON_PARAMS
+    )
+
+
+@api_view
+@versioned_page(post_namespaces)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return list_response(
+        request, comment_resource, Comment.objects.filter(post=post)
+    )
+
+
+@api_view
+def groups(request):
+    return list_response(request, group_resource, Group.objects.all())
+
+
+@api_view
+@versioned_page(group_namespaces)
+def group_detail(request, slug):
+    group, names = get_detail(
+        request, group_resource, Group.objects.all(), slug=slug
+    )
+    return JsonResponse(
+        group_resource.serialize(group, names), json_dumps_params=JSON_PARAMS
+    )
+
+
+@api_view
+@versioned_page(group_namespaces)
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return list_response(
+        request, post_resource, Post.objects.filter(group=group)
+    )
+
+
+@api_view
+def profile_detail(request, username):
+    author, names = get_detail(
+        request, profile_resource, User.objects.all(), username=username
+    )
+    # Read from the cache only when a counter is requested
+    author.author_stats = SimpleLazyObject(lambda: get_stats(author))
+    return JsonResponse(
+        profile_resource.serialize(author, names),
+        json_dumps_params=JSON_PARAMS
+    )
+
+
+@api_view
+@versioned_page(profile_namespaces)
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return list_response(
+        request, post_resource, Post.objects.filter(author=author)
+    )
@@ -0,0 +1,101 @@
+"""
+Measurement of requests through the Django test client.
+
+Latency and queries are measured on every iteration, memory is traced
+in a separate pass since tracemalloc slows the interpreter down. Memory
+is the peak size of blocks traced while serving one request.
+"""
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def summary(values, digits=3):
+    result = {f'p{percent}': percentile(values, percent)
+              for percent in PERCENTILES}
+    result['mean'] = sum(values) / len(values)
+    result['max'] = max(values)
+    return {key: round(value, digits) for key, value in result.items()}
+
+
+class Runner:
+    def __init__(self, iterations=200, warmup=20, clear_cache=False):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.clear_cache = clear_cache
+
+    def client(self, scenario):
+        client = Client()
+        if scenario.user is not None:
+            client.force_login(scenario.user)
+        return client
+
+    def request(self, client, scenario):
+        if self.clear_cache:
+            cache.clear()
+        response = getattr(client, scenario.method)(scenario.url)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f'{scenario.name}: {scenario.url} returned '
+                f'{response.status_code}'
+            )
+        return response
+
+    def measure(self, scenario):
+        client = self.client(scenario)
+        for _ in range(self.warmup):
+            self.request(client, scenario)
+        latencies = []
+        queries = []
+        for _ in range(self.iterations):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = self.request(client, scenario)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        allocated = []
+        tracemalloc.start()
+        try:
+            for _ in range(self.iterations):
+                tracemalloc.clear_traces()
+                self.request(client, scenario)
+                allocated.append(tracemalloc.get_traced_memory()[1] / 1024)
+        finally:
+            tracemalloc.stop()
+        return {
+            'status': response.status_code,
+            'latency_ms': summary(latencies),
+            'queries': summary(queries, digits=1),
+            'peak_memory_kib': summary(allocated, digits=1),
+        }
+
+    def run(self, scenarios):
+        return {
+            scenario.name: self.measure(scenario) for scenario in scenarios
+        }
+
+
+def compare(baseline, current, metric='latency_ms', key='p50'):
+    """Relative change of a metric per scenario present in both runs."""
+    changes = {}
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        before = baseline[name][metric][key]
+        after = result[metric][key]
+        changes[name] = (before, after, (after - before) / before
+                         if before else 0.0)
+    return changes
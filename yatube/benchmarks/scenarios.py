@@ -0,0 +1,53 @@
+"""
+Requests driven by the benchmark of the posts views.
+
+Targets are picked from the seeded dataset: the busiest group, author,
+post and follower, so every page renders a full set of posts.
+"""
+from collections import namedtuple
+
+from django.db.models import Count
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+Scenario = namedtuple('Scenario', 'name method url user')
+
+
+def busiest(queryset, related):
+    return (
+        queryset.annotate(number=Count(related))
+        .order_by('-number', 'pk').first()
+    )
+
+
+def build_scenarios():
+    group = busiest(Group.objects.all(), 'group')
+    author = busiest(User.objects.all(), 'posts')
+    post = busiest(Post.objects.all(), 'comments')
+    follower = User.objects.get(pk=(
+        Follow.objects.values('user').annotate(number=Count('pk'))
+        .order_by('-number', 'user').values_list('user', flat=True)[0]
+    ))
+    return [
+        Scenario('index', 'get', reverse('posts:index'), None),
+        Scenario(
+            'group_posts', 'get',
+            reverse('posts:group_posts', args=(group.slug,)), None
+        ),
+        Scenario(
+            'profile', 'get',
+            reverse('posts:profile', args=(author.username,)), None
+        ),
+        Scenario(
+            'post_detail', 'get',
+            reverse('posts:post_detail', args=(post.pk,)), None
+        ),
+        Scenario(
+            'follow_index', 'get', reverse('posts:follow_index'), follower
+        ),
+        Scenario(
+            'post_like_or_unlike', 'post',
+            reverse('posts:post_like_or_unlike', args=(post.pk,)), follower
+        ),
+    ]
@@ -0,0 +1,82 @@
+"""
+Versioned cache namespaces.
+
+Cache keys include the version token of every namespace they depend on,
+bumping a namespace makes all of its keys unreachable at once. Tokens
+start with the time they were created at, so they also tell when the
+data behind a namespace last changed. A token younger than
+``DB_REPLICA_LAG`` pins the request to the primary database: the
+entries it fills must not be read from a replica behind the change.
+"""
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db import pin_primary
+
+VERSION_KEY = 'cache_version:{}'
+
+
+def namespace(*parts):
+    return ':'.join(str(part) for part in parts)
+
+
+def new_version():
+    """Unique token prefixed with the current time in microseconds."""
+    return f'{time.time_ns() // 1000:x}-{uuid4().hex[:16]}'
+
+
+def token_time(version):
+    """Unix time a token was created at, None for older formats."""
+    created, _, unique = version.partition('-')
+    try:
+        return int(created, 16) / 1e6
+    except ValueError:
+        return None
+
+
+def versions_time(versions):
+    """Unix time of the newest token in a get_versions() string."""
+    times = [token_time(version) for version in versions.split('.')]
+    if None in times:
+        # Token of an older format, its age is unknown
+        return None
+    return max(times, default=None)
+
+
+def is_recent(version):
+    """Whether replicas may still lag behind the change of the token."""
+    created = token_time(version)
+    return (
+        created is not None
+        and time.time() - created < settings.DB_REPLICA_LAG
+    )
+
+
+def get_version_map(namespaces):
+    """Version token of every namespace in one cache round trip."""
+    keys = {VERSION_KEY.format(name): name for name in namespaces}
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    if any(is_recent(version) for version in versions.values()):
+        pin_primary()
+    return {name: versions[key] for key, name in keys.items()}
+
+
+def get_versions(*namespaces):
+    """Version tokens of the namespaces joined into one string."""
+    versions = get_version_map(namespaces)
+    return '.'.join(versions[name] for name in namespaces)
+
+
+def bump(*namespaces):
+    """Invalidate every key built from the namespaces."""
+    token = new_version()
+    cache.set_many(
+        {VERSION_KEY.format(name): token for name in namespaces}, None
+    )
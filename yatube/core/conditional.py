@@ -0,0 +1,58 @@
+"""
+Conditional GET for pages built from versioned cache namespaces.
+
+The ETag of a page is a digest of the version tokens of the namespaces
+it is rendered from and of the current user, Last-Modified is the time
+of the newest token. Validators cost one cache lookup and a page is
+never rendered to compute them.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.views.decorators.http import condition
+
+from core.cache import get_versions, versions_time
+
+
+def page_versions(request, get_namespaces, *args, **kwargs):
+    """
+    Versions of the namespaces of the page, looked up once per request.
+    None when ``get_namespaces`` returns None.
+    """
+    if not hasattr(request, 'page_versions'):
+        namespaces = get_namespaces(request, *args, **kwargs)
+        request.page_versions = (
+            None if namespaces is None else get_versions(*namespaces)
+        )
+    return request.page_versions
+
+
+def versioned_page(get_namespaces):
+    """
+    Answer 304 Not Modified while the namespaces returned by
+    ``get_namespaces(request, *args, **kwargs)`` are unchanged.
+    ``get_namespaces`` returns None to skip validators, e.g. for a
+    missing object.
+    """
+    def versions(request, *args, **kwargs):
+        return page_versions(request, get_namespaces, *args, **kwargs)
+
+    def etag(request, *args, **kwargs):
+        tokens = versions(request, *args, **kwargs)
+        if tokens is None:
+            return None
+        user = request.user.pk if request.user.is_authenticated else ''
+        digest = hashlib.md5(f'{tokens}:{user}'.encode()).hexdigest()
+        # Weak, rendered pages differ in their masked CSRF tokens
+        return f'W/"{digest}"'
+
+    def last_modified(request, *args, **kwargs):
+        tokens = versions(request, *args, **kwargs)
+        if tokens is None:
+            return None
+        modified = versions_time(tokens)
+        if modified is None:
+            return None
+        return datetime.fromtimestamp(modified, timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,77 @@
+"""
+Database routing and connection setup.
+
+Writes go to the primary database, reads are spread over
+``DATABASE_REPLICAS``. A request is pinned to the primary once it
+writes, and for unsafe methods from the start. A client that has just
+written keeps reading from the primary for ``DB_REPLICA_LAG`` seconds,
+see ``PrimaryPinMiddleware``. Requests filling cache entries of a
+namespace bumped within the lag are pinned as well, see ``core.cache``,
+a replica behind the write would store stale rows under the new version.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+current_pin = ContextVar('primary_pin', default=None)
+
+
+class PrimaryPin:
+    """Routing state of one request."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica_used = False
+
+
+def pin_primary():
+    """Route the remaining reads of the current request to the primary."""
+    pin = current_pin.get()
+    if pin is not None:
+        pin.pinned = True
+
+
+def replica_used():
+    """Whether the current request has read from a replica."""
+    pin = current_pin.get()
+    return pin is not None and pin.replica_used
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        pin = current_pin.get()
+        if not settings.DATABASE_REPLICAS or pin is not None and pin.pinned:
+            return DEFAULT_DB_ALIAS
+        if pin is not None:
+            pin.replica_used = True
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        pin = current_pin.get()
+        if pin is not None:
+            # Later reads of the request see the written rows
+            pin.pinned = pin.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.DB_SQLITE_WAL:
+        return
+    with connection.cursor() as cursor:
+        # In-memory test databases keep their own journal mode
+        cursor.execute('PRAGMA journal_mode=WAL')
+        # Durable at checkpoints only, safe from corruption in WAL mode
+        cursor.execute('PRAGMA synchronous=NORMAL')
@@ -0,0 +1,243 @@
+"""
+Request instrumentation.
+
+Timings of the current request are collected into a ``RequestMetrics``
+held in a context variable: SQL through ``connection.execute_wrapper``,
+templates through ``InstrumentedDjangoTemplates`` and cache lookups
+through wrapped ``get``/``get_many`` of every configured cache.
+Finished requests are aggregated into per view histograms kept in
+process memory and rendered in the Prometheus text format.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+
+from django.template.backends.django import DjangoTemplates, Template
+
+current = ContextVar('request_metrics', default=None)
+
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = (
+    ('request_duration_seconds', 'Time spent serving requests',
+     'total', SECONDS_BUCKETS),
+    ('db_duration_seconds', 'Time spent in SQL queries per request',
+     'db_time', SECONDS_BUCKETS),
+    ('template_duration_seconds', 'Time spent rendering templates '
+     'per request', 'template_time', SECONDS_BUCKETS),
+    ('db_queries', 'SQL queries per request', 'queries', QUERIES_BUCKETS),
+)
+COUNTERS = (
+    ('cache_hits_total', 'Cache lookups that found a value', 'cache_hits'),
+    ('cache_misses_total', 'Cache lookups that found nothing',
+     'cache_misses'),
+)
+PREFIX = 'yatube_'
+
+MISSING = object()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Nested renders and lookups of a get_many are counted once
+        self.template_depth = 0
+        self.in_get_many = False
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value of the ``Server-Timing`` header, durations in ms."""
+        return ', '.join((
+            f'total;dur={self.total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+        ))
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper adding the query time to the current request."""
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def count_cache(metrics, hits, misses):
+    metrics.cache_hits += hits
+    metrics.cache_misses += misses
+
+
+def instrument_cache(cache):
+    """Count hits and misses of a cache backend instance, once."""
+    if getattr(cache, 'metrics_instrumented', False):
+        return
+    get, get_many = cache.get, cache.get_many
+
+    def counted_get(key, default=None, version=None):
+        metrics = current.get()
+        if metrics is None or metrics.in_get_many:
+            return get(key, default, version=version)
+        value = get(key, MISSING, version=version)
+        if value is MISSING:
+            count_cache(metrics, 0, 1)
+            return default
+        count_cache(metrics, 1, 0)
+        return value
+
+    def counted_get_many(keys, version=None):
+        metrics = current.get()
+        if metrics is None or metrics.in_get_many:
+            return get_many(keys, version=version)
+        keys = list(keys)
+        # BaseCache.get_many looks the keys up with get one by one
+        metrics.in_get_many = True
+        try:
+            values = get_many(keys, version=version)
+        finally:
+            metrics.in_get_many = False
+        count_cache(metrics, len(values), len(keys) - len(values))
+        return values
+
+    cache.get = counted_get
+    cache.get_many = counted_get_many
+    cache.metrics_instrumented = True
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current.get()
+        if metrics is None or metrics.template_depth:
+            # Time of nested renders is part of the outermost one
+            return super().render(context, request)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django templates backend timing every rendered template."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            super().from_string(template_code).template, self
+        )
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(
+            super().get_template(template_name).template, self
+        )
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        """Cumulative ``(le, count)`` pairs ending with ``+Inf``."""
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    """Histograms and counters per view name of this process."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.clear()
+
+    def clear(self):
+        self.views = {}
+
+    def observe(self, view, metrics):
+        with self.lock:
+            if view not in self.views:
+                self.views[view] = {
+                    name: Histogram(buckets)
+                    for name, help_text, attribute, buckets in HISTOGRAMS
+                }
+                self.views[view].update(
+                    (name, 0) for name, help_text, attribute in COUNTERS
+                )
+            series = self.views[view]
+            for name, help_text, attribute, buckets in HISTOGRAMS:
+                series[name].observe(getattr(metrics, attribute))
+            for name, help_text, attribute in COUNTERS:
+                series[name] += getattr(metrics, attribute)
+
+    def render(self):
+        """Everything collected in the Prometheus text format."""
+        with self.lock:
+            lines = []
+            for name, help_text, attribute, buckets in HISTOGRAMS:
+                lines.extend(header(name, help_text, 'histogram'))
+                for view, series in sorted(self.views.items()):
+                    histogram = series[name]
+                    label = f'view="{escape(view)}"'
+                    for bound, count in histogram.samples():
+                        lines.append(
+                            f'{PREFIX}{name}_bucket{{{label},le="{bound}"}} '
+                            f'{count}'
+                        )
+                    lines.append(
+                        f'{PREFIX}{name}_sum{{{label}}} {histogram.sum}'
+                    )
+                    lines.append(
+                        f'{PREFIX}{name}_count{{{label}}} '
+                        f'{sum(histogram.counts)}'
+                    )
+            for name, help_text, attribute in COUNTERS:
+                lines.extend(header(name, help_text, 'counter'))
+                for view, series in sorted(self.views.items()):
+                    lines.append(
+                        f'{PREFIX}{name}{{view="{escape(view)}"}} '
+                        f'{series[name]}'
+                    )
+            return '\n'.join(lines) + '\n'
+
+
+def header(name, help_text, kind):
+    return (
+        f'# HELP {PREFIX}{name} {help_text}',
+        f'# TYPE {PREFIX}{name} {kind}',
+    )
+
+
+def escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+registry = Registry()
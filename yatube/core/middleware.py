@@ -0,0 +1,159 @@
+import mimetypes
+import os
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from core.db import PrimaryPin, current_pin
+from core.metrics import (
+    RequestMetrics, current, instrument_cache, record_query, registry
+)
+
+# Content-Encoding of the precompressed siblings in order of preference
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(request):
+    """
+    Content codings of Accept-Encoding not refused with q=0, ``*``
+    accepts the codings not listed.
+    """
+    qualities = {}
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.partition(';')
+        params = params.strip()
+        try:
+            quality = float(params[2:]) if params.startswith('q=') else 1
+        except ValueError:
+            quality = 1
+        qualities[coding.strip().lower()] = quality
+    wildcard = qualities.pop('*', 0)
+    return {
+        coding for coding, suffix in STATIC_ENCODINGS
+        if qualities.get(coding, wildcard) > 0
+    }
+
+
+class StaticFilesMiddleware:
+    """
+    Serve collected static files when no front proxy does, picking the
+    precompressed sibling the client accepts. Names with a content hash
+    are cached for STATIC_MAX_AGE, other names are revalidated sooner.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = None
+        if (settings.STATIC_SERVE and request.method in ('GET', 'HEAD')
+                and request.path.startswith(settings.STATIC_URL)):
+            response = self.serve(request, request.path[
+                len(settings.STATIC_URL):
+            ])
+        if response is None:
+            response = self.get_response(request)
+        return response
+
+    def serve(self, request, name):
+        # Siblings are served only through negotiation, as is they would
+        # reach clients without Content-Encoding
+        if name.endswith(tuple(suffix for _, suffix in STATIC_ENCODINGS)):
+            return None
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        if staticfiles_storage.is_immutable(name):
+            max_age = settings.STATIC_MAX_AGE
+            cache_control = f'public, max-age={max_age}, immutable'
+        else:
+            max_age = settings.STATIC_UNHASHED_MAX_AGE
+            cache_control = f'public, max-age={max_age}'
+        encoding = None
+        accepted = accepted_encodings(request)
+        for coding, suffix in STATIC_ENCODINGS:
+            if coding in accepted and os.path.isfile(path + suffix):
+                encoding = coding
+                path += suffix
+                break
+        stat = os.stat(path)
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'))
+            # Guessed from the name without the suffix of the coding
+            content_type, _ = mimetypes.guess_type(name)
+            response['Content-Type'] = (
+                content_type or 'application/octet-stream'
+            )
+            response['Last-Modified'] = http_date(stat.st_mtime)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Cache-Control'] = cache_control
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class MetricsMiddleware:
+    """Measure requests, report them in Server-Timing and /metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for alias in settings.CACHES:
+            instrument_cache(caches[alias])
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        metrics.finish()
+        match = request.resolver_match
+        registry.observe(match.view_name if match else 'unresolved', metrics)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        return response
+
+
+class PrimaryPinMiddleware:
+    """Route reads to the primary for writes and recent writers."""
+    cookie = 'use_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+        pin = PrimaryPin(not safe or self.cookie in request.COOKIES)
+        token = current_pin.set(pin)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_pin.reset(token)
+        if pin.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                self.cookie, '1', max_age=settings.DB_REPLICA_LAG,
+                httponly=True, samesite='Lax'
+            )
+        return response
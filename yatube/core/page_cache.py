@@ -0,0 +1,85 @@
+"""
+Whole-page cache for anonymous visitors.
+
+A rendered response is stored under the path of the request, the query
+parameters the view reads and the version tokens of the namespaces the
+page is built from, so the signals bumping namespaces for cached
+fragments invalidate the pages too. Other parameters are left out of
+the key, junk query strings are served the cached page instead of
+adding entries. Requests with a session cookie, i.e. logged in users and
+visitors with state such as messages, always get the page rendered.
+
+Responses are stored before the outer middleware runs. Pages which
+will get a cookie from it are not stored: CSRF tokens, messages and
+session changes belong to one visitor.
+"""
+import hashlib
+from functools import wraps
+from http import HTTPStatus
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.conditional import page_versions
+
+PAGE_KEY = 'page:{}:{}'
+PAGE_PARAMS = ('cursor',)
+
+
+def cacheable(request):
+    return (
+        settings.ANONYMOUS_PAGE_TIMEOUT
+        and request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def page_key(request, params, tokens):
+    query = urlencode(sorted(
+        (name, request.GET.getlist(name))
+        for name in params if name in request.GET
+    ), doseq=True)
+    path = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return PAGE_KEY.format(path, tokens)
+
+
+def sets_cookies(request, response):
+    """Whether the response has or will get cookies of the visitor."""
+    messages = getattr(request, '_messages', None)
+    session = getattr(request, 'session', None)
+    return bool(
+        response.cookies
+        or request.META.get('CSRF_COOKIE_USED')
+        or (messages is not None and messages.added_new)
+        or (session is not None and session.modified)
+    )
+
+
+def anonymous_page(get_namespaces, params=PAGE_PARAMS):
+    """
+    Serve anonymous requests from the cache while the namespaces
+    returned by ``get_namespaces(request, *args, **kwargs)`` are
+    unchanged, for at most ``ANONYMOUS_PAGE_TIMEOUT`` seconds.
+    The page may only depend on the query parameters in ``params``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not cacheable(request):
+                return view(request, *args, **kwargs)
+            tokens = page_versions(request, get_namespaces, *args, **kwargs)
+            if tokens is None:
+                return view(request, *args, **kwargs)
+            key = page_key(request, params, tokens)
+            response = cache.get(key)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if (response.status_code == HTTPStatus.OK
+                    and not response.streaming
+                    and not sets_cookies(request, response)):
+                cache.set(key, response, settings.ANONYMOUS_PAGE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,172 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by an opaque cursor built from the ``(pub_date, pk)``
+of the row at the page boundary, so fetching any page costs one
+``LIMIT per_page + 1`` query and never issues ``COUNT(*)`` or ``OFFSET``.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import Sequence
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from core.tiered import tiered_cache
+
+LAST_PAGE_CURSOR = 'last'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_token(values):
+    payload = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Values of an opaque token, raise InvalidCursor when malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor(token)
+
+
+def encode_cursor(pub_date, pk, reverse=False):
+    return encode_token([pub_date.isoformat(), pk, int(reverse)])
+
+
+def decode_cursor(token):
+    """
+    Return ``(pub_date, pk, reverse)`` for a cursor token.
+    ``pub_date`` and ``pk`` are None for the last page cursor.
+    """
+    if token == LAST_PAGE_CURSOR:
+        return None, None, True
+    try:
+        pub_date, pk, reverse = decode_token(token)
+        pub_date = parse_datetime(pub_date)
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if pub_date is None or not isinstance(pk, int):
+        raise InvalidCursor(token)
+    return pub_date, pk, bool(reverse)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset newest first by ``(pub_date, pk)``.
+    ``keys`` names other fields holding the date and the tie breaker,
+    e.g. annotations of columns covered by an index.
+    ``count_timeout`` enables ``count`` - an approximate total
+    cached for the given number of seconds.
+    """
+    last_cursor = LAST_PAGE_CURSOR
+
+    def __init__(self, object_list, per_page, count_timeout=None,
+                 keys=('pub_date', 'pk')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.count_timeout = count_timeout
+        self.keys = keys
+
+    def get_page(self, cursor=None):
+        """Return a valid page, falling back to the first one."""
+        try:
+            pub_date, pk, reverse = (
+                decode_cursor(cursor) if cursor else (None, None, False)
+            )
+        except InvalidCursor:
+            pub_date, pk, reverse = None, None, False
+        date_key, pk_key = self.keys
+        queryset = self.object_list
+        if reverse:
+            if pub_date is not None:
+                queryset = queryset.filter(
+                    Q(**{f'{date_key}__gt': pub_date})
+                    | Q(**{date_key: pub_date, f'{pk_key}__gt': pk})
+                )
+            rows = list(
+                queryset.order_by(date_key, pk_key)[:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = pub_date is not None
+        else:
+            if pub_date is not None:
+                queryset = queryset.filter(
+                    Q(**{f'{date_key}__lt': pub_date})
+                    | Q(**{date_key: pub_date, f'{pk_key}__lt': pk})
+                )
+            rows = list(
+                queryset.order_by(f'-{date_key}', f'-{pk_key}')
+                [:self.per_page + 1]
+            )
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = pub_date is not None
+        if not rows and pub_date is not None:
+            return self.get_page()
+        return KeysetPage(rows, self, has_next, has_previous)
+
+    @cached_property
+    def count(self):
+        """Cached total number of objects or None when disabled."""
+        if self.count_timeout is None:
+            return None
+        query = str(self.object_list.query).encode()
+        key = 'keyset_count:' + hashlib.md5(query).hexdigest()
+        return tiered_cache.get_or_set(
+            key, self.object_list.count, self.count_timeout
+        )
+
+
+class KeysetPage(Sequence):
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Keyset page of %s objects>' % len(self)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def cursor(self, obj, reverse=False):
+        date_key, pk_key = self.paginator.keys
+        return encode_cursor(
+            getattr(obj, date_key), getattr(obj, pk_key), reverse
+        )
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.cursor(self.object_list[0], reverse=True)
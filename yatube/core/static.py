@@ -0,0 +1,75 @@
+"""
+Static files with content-hashed names, precompressed at collect time.
+
+``collectstatic`` stores every file under a name carrying the hash of
+its content and writes the ``staticfiles.json`` manifest mapping the
+names to them, so the files can be cached by browsers forever. Text
+files get ``.gz`` and, with the ``brotli`` package installed, ``.br``
+siblings for ``StaticFilesMiddleware`` to serve without compressing on
+every request.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Formats compressing well, images other than SVG are compressed already
+COMPRESSED_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.ico', '.txt', '.html', '.json', '.xml'
+)
+# Compressed siblings saving less than this share of the size are dropped
+MAX_RATIO = 0.95
+
+
+def compressors():
+    """Suffixes of the precompressed siblings and their compressors."""
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage writing precompressed copies of text files."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hashed_names = frozenset(self.hashed_files.values())
+
+    def stored_name(self, name):
+        # Until collectstatic runs files are served from the finders
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, *args, **kwargs):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+            *args, **kwargs
+        ):
+            yield name, hashed_name, processed
+            if hashed_name is not None:
+                names.update((name, hashed_name))
+        self.hashed_names = frozenset(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSED_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        """Write the compressed siblings smaller than the file itself."""
+        with self.open(name) as file:
+            data = file.read()
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            if len(compressed) < len(data) * MAX_RATIO:
+                self._save(name + suffix, ContentFile(compressed))
+
+    def is_immutable(self, name):
+        """Whether the name carries the hash of its content."""
+        return name in self.hashed_names
@@ -0,0 +1,11 @@
+from django import template
+
+from core.cache import get_versions, namespace
+
+register = template.Library()
+
+
+@register.simple_tag
+def cache_version(*parts):
+    """Version of the namespace built from parts, e.g. 'group' group.pk"""
+    return get_versions(namespace(*parts))
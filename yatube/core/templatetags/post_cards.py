@@ -0,0 +1,57 @@
+"""
+Post cards cached one by one.
+
+A card is stored under the post id and the version of its ``post``
+namespace, bumped by signals when the post or its likes change. Every
+feed rendering a post reuses its card, so a page of cached cards costs
+two ``get_many`` calls and only missing cards are rendered. The first
+card of a page is likely above the fold and loads its image eagerly,
+it is cached apart from the lazy one. Posts read from a replica are
+not stored under a version bumped within the replica lag.
+"""
+from django import template
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core.cache import get_version_map, is_recent, namespace
+from core.db import replica_used
+
+register = template.Library()
+
+CARD_KEY = 'post_card:{}:{}:{}'
+CARD_TEMPLATE = 'includes/post_card.html'
+CARD_TIMEOUT = 60 * 60 * 3
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Markup of the cards of the posts, in order."""
+    posts = list(posts)
+    versions = get_version_map(namespace('post', post.pk) for post in posts)
+    keys = [
+        CARD_KEY.format(
+            post.pk, versions[namespace('post', post.pk)],
+            'lazy' if number else 'eager'
+        )
+        for number, post in enumerate(posts)
+    ]
+    cards = cache.get_many(keys)
+    # Posts are read before their versions are known
+    stale = replica_used()
+    missing = {}
+    rendered = {}
+    for number, (key, post) in enumerate(zip(keys, posts)):
+        if key not in cards:
+            # Cards are shared by all users, the request is left out
+            card = get_template(CARD_TEMPLATE).render(
+                {'post': post, 'lazy': number > 0}
+            )
+            rendered[key] = card
+            version = versions[namespace('post', post.pk)]
+            if not (stale and is_recent(version)):
+                missing[key] = card
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+    cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
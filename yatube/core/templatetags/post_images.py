@@ -0,0 +1,59 @@
+from django import template
+from django.conf import settings
+
+from core.thumbnails import find_thumbnail
+from posts.thumbnails import schedule_missing, variants
+
+register = template.Library()
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, lazy=True):
+    """
+    Responsive picture of the post image built from the pre-generated
+    variants, ``lazy`` defers loading of images below the fold. Variants
+    are only looked up, while they are missing the original image is
+    shown and their generation is scheduled.
+    """
+    if not post.image:
+        return {}
+    srcsets = {}
+    missing = False
+    for variant in variants():
+        thumbnail = find_thumbnail(
+            post.image, variant.geometry, **variant.options
+        )
+        if thumbnail is None:
+            missing = True
+            continue
+        srcsets.setdefault(variant.format, []).append(
+            (thumbnail.url, variant)
+        )
+    if missing:
+        schedule_missing(post.image)
+        return {
+            'src': post.image.url,
+            'width': post.image_width,
+            'height': post.image_height,
+            'lazy': lazy,
+        }
+    *sources, (fallback_format, fallback) = srcsets.items()
+    largest_url, largest = fallback[-1]
+    return {
+        'sources': [
+            {'type': MIME_TYPES[image_format], 'srcset': srcset(images)}
+            for image_format, images in sources
+        ],
+        'src': largest_url,
+        'srcset': srcset(fallback),
+        'sizes': settings.POST_IMAGE_SIZES,
+        'width': largest.width,
+        'height': largest.height,
+        'lazy': lazy,
+    }
+
+
+def srcset(images):
+    return ', '.join(f'{url} {variant.width}w' for url, variant in images)
@@ -0,0 +1,268 @@
+"""
+Bounded, content-addressed thumbnail store for ``sorl.thumbnail``.
+
+Thumbnail names are derived from the SHA-256 of the source file instead
+of its name, so identical uploads share thumbnails and a thumbnail is
+found on disk by its name alone after the key-value store is flushed.
+Only one worker renders a variant at a time, the others wait for it
+under a lock in the shared cache.
+
+Files on disk are capped at ``THUMBNAIL_STORE_MAX_BYTES``: once the cap
+is exceeded the least recently used thumbnails are deleted. Use is the
+file mtime, refreshed at most every ``THUMBNAIL_TOUCH_INTERVAL`` seconds
+when a thumbnail is looked up. Thumbnails used within
+``THUMBNAIL_STORE_MIN_AGE`` seconds are kept, cached pages may still
+link to them. Scans run in a background worker, a store left over the
+cap by recent thumbnails is scanned again only after it grows by
+``THUMBNAIL_STORE_RESCAN_BYTES`` or ``PRUNE_RESCAN_INTERVAL`` passes.
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import ImageFile
+
+from core.tiered import LOCK_POLL
+
+DIGEST_KEY = 'thumbnail_source:{}'
+RENDER_LOCK_KEY = 'thumbnail_lock:{}'
+TOUCH_KEY = 'thumbnail_touch:{}'
+STORE_BYTES_KEY = 'thumbnail_store_bytes'
+PRUNE_LOCK_KEY = 'thumbnail_prune_lock'
+# Store size a scan could not prune below the cap
+PRUNE_FLOOR_KEY = 'thumbnail_prune_floor'
+# Seconds a worker renders a variant before others stop waiting for it
+RENDER_LOCK_TIMEOUT = 30
+PRUNE_LOCK_TIMEOUT = 60 * 10
+# Share of the cap the store is pruned down to, so pruning is rare
+PRUNE_TARGET = 0.9
+# Seconds before recent thumbnails over the cap are scanned again
+PRUNE_RESCAN_INTERVAL = 60 * 60
+
+pruner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prune')
+
+
+def source_version(source):
+    """
+    Name, size and modification time of the source file, names are
+    reused by new files once the old ones are deleted.
+    """
+    storage = source.storage
+    try:
+        modified = storage.get_modified_time(source.name).timestamp()
+    except NotImplementedError:
+        modified = None
+    return tokey(source.key, storage.size(source.name), modified)
+
+
+def source_digest(source):
+    """SHA-256 of the source file, read once per version of the file."""
+    key = DIGEST_KEY.format(source_version(source))
+    digest = cache.get(key)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        with source.storage.open(source.name) as file:
+            for chunk in file.chunks():
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        cache.set(key, digest, None)
+    return digest
+
+
+@contextmanager
+def render_lock(name):
+    """
+    Wait until no other worker renders the thumbnail, then hold the lock.
+    Proceeds without it when the holder takes too long.
+    """
+    key = RENDER_LOCK_KEY.format(name)
+    deadline = time.monotonic() + RENDER_LOCK_TIMEOUT
+    acquired = cache.add(key, True, RENDER_LOCK_TIMEOUT)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        acquired = cache.add(key, True, RENDER_LOCK_TIMEOUT)
+    try:
+        yield
+    finally:
+        if acquired:
+            cache.delete(key)
+
+
+def local_path(name):
+    """Path of a stored file, None for storages without local files."""
+    try:
+        return default.storage.path(name)
+    except NotImplementedError:
+        return None
+
+
+def touch(thumbnail):
+    """Mark the thumbnail as used for LRU eviction."""
+    if not cache.add(
+        TOUCH_KEY.format(thumbnail.name), True,
+        settings.THUMBNAIL_TOUCH_INTERVAL
+    ):
+        return
+    path = local_path(thumbnail.name)
+    if path is not None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+def prune(max_bytes=None):
+    """
+    Delete least recently used thumbnails until the store is below the
+    cap, return the number of deleted files and the bytes left.
+    """
+    if max_bytes is None:
+        max_bytes = settings.THUMBNAIL_STORE_MAX_BYTES
+    root = local_path(sorl_settings.THUMBNAIL_PREFIX)
+    if root is None:
+        return 0, 0
+    files = []
+    for directory, subdirectories, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for mtime, size, path in files)
+    deleted = 0
+    if total > max_bytes:
+        used_since = time.time() - settings.THUMBNAIL_STORE_MIN_AGE
+        for mtime, size, path in sorted(files):
+            if total <= max_bytes * PRUNE_TARGET or mtime > used_since:
+                break
+            name = os.path.relpath(path, default.storage.location)
+            thumbnail = ImageFile(name.replace(os.sep, '/'), default.storage)
+            default.kvstore.delete(thumbnail, delete_thumbnails=False)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            deleted += 1
+    cache.set(STORE_BYTES_KEY, total, None)
+    if total > max_bytes:
+        cache.set(PRUNE_FLOOR_KEY, total, PRUNE_RESCAN_INTERVAL)
+    else:
+        cache.delete(PRUNE_FLOOR_KEY)
+    return deleted, total
+
+
+def prune_in_worker():
+    try:
+        return prune()
+    finally:
+        cache.delete(PRUNE_LOCK_KEY)
+        connections.close_all()
+
+
+def account(thumbnail):
+    """
+    Add a new thumbnail to the store size, schedule pruning over the cap.
+    Return the scheduled prune or None.
+    """
+    size = default.storage.size(thumbnail.name)
+    try:
+        total = cache.incr(STORE_BYTES_KEY, size)
+    except ValueError:
+        # Size unknown yet, a scan counts it
+        total = None
+    if total is not None:
+        if total <= settings.THUMBNAIL_STORE_MAX_BYTES:
+            return None
+        floor = cache.get(PRUNE_FLOOR_KEY)
+        if (
+            floor is not None
+            and total - floor < settings.THUMBNAIL_STORE_RESCAN_BYTES
+        ):
+            # Nothing was evictable, scanning again would not free space
+            return None
+    if not cache.add(PRUNE_LOCK_KEY, True, PRUNE_LOCK_TIMEOUT):
+        return None
+    return pruner.submit(prune_in_worker)
+
+
+def find_thumbnail(file_, geometry_string, **options):
+    """Thumbnail already in the store or None, for request handlers."""
+    cached, name = default.backend.lookup(file_, geometry_string, **options)
+    return cached
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """sorl.thumbnail backend of the bounded content-addressed store."""
+
+    def full_options(self, source, options):
+        """Options completed with defaults the way sorl does."""
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+    def lookup(self, file_, geometry_string, **options):
+        """
+        Stored thumbnail and its name, the thumbnail is None when it is
+        not rendered yet. Never renders.
+        """
+        source = ImageFile(file_)
+        options = self.full_options(source, options)
+        thumbnail = ImageFile(
+            self._get_thumbnail_filename(source, geometry_string, options),
+            default.storage
+        )
+        cached = default.kvstore.get(thumbnail)
+        if cached:
+            touch(cached)
+        return cached, thumbnail.name
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        cached, name = self.lookup(file_, geometry_string, **options)
+        if cached:
+            return cached
+        with render_lock(name):
+            # Rendered meanwhile by the lock holder, found in the store
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        super()._create_thumbnail(
+            source_image, geometry_string, options, thumbnail
+        )
+        account(thumbnail)
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        try:
+            source_key = source_digest(source)
+        except OSError:
+            # Missing source, sorl reports it when reading the image
+            source_key = source.key
+        key = tokey(source_key, geometry_string, serialize(options))
+        path = f'{key[:2]}/{key[2:4]}/{key}'
+        return (
+            f'{sorl_settings.THUMBNAIL_PREFIX}{path}.'
+            f'{EXTENSIONS[options["format"]]}'
+        )
@@ -0,0 +1,110 @@
+"""
+Two-level cache.
+
+Values are kept in a small in-process LRU in front of the shared cache,
+so hot keys cost no round trip for ``LOCAL_CACHE_TIMEOUT`` seconds.
+Other processes do not see deletions during that time, the local tier
+suits values which may lag a few seconds behind.
+
+``get_or_set`` protects expensive values from stampedes:
+a value is recomputed early with a probability growing as it nears
+expiry (XFetch), so a single request usually refreshes it while others
+keep serving the current value. A missing value is computed under a
+lock in the shared cache while other requests wait for it.
+"""
+import math
+import random
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+
+LOCK_KEY = 'lock:{}'
+# Polling interval of requests waiting for a locked value, seconds
+LOCK_POLL = 0.05
+
+
+class TieredCache:
+    def __init__(self, beta=1.0, lock_timeout=10):
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.local = OrderedDict()
+        self.lock = Lock()
+
+    def get_local(self, key):
+        with self.lock:
+            entry = self.local.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self.local[key]
+                return None
+            self.local.move_to_end(key)
+            return entry
+
+    def set_local(self, key, value):
+        timeout = settings.LOCAL_CACHE_TIMEOUT
+        if not timeout:
+            return
+        with self.lock:
+            self.local[key] = (value, time.monotonic() + timeout)
+            self.local.move_to_end(key)
+            while len(self.local) > settings.LOCAL_CACHE_SIZE:
+                self.local.popitem(last=False)
+
+    def fresh(self, entry):
+        """Whether a shared entry is used instead of recomputing early."""
+        value, delta, expires = entry
+        # 1 - random() is never 0, the log is always defined
+        early = -delta * self.beta * math.log(1 - random.random())
+        return time.time() + early < expires
+
+    def compute(self, key, default, timeout):
+        started = time.time()
+        value = default() if callable(default) else default
+        delta = time.time() - started
+        cache.set(key, (value, delta, time.time() + timeout), timeout)
+        self.set_local(key, value)
+        return value
+
+    def get_or_set(self, key, default, timeout):
+        """Value of the key, computing ``default`` when missing."""
+        local = self.get_local(key)
+        if local is not None:
+            return local[0]
+        entry = cache.get(key)
+        if entry is not None:
+            if self.fresh(entry):
+                self.set_local(key, entry[0])
+                return entry[0]
+            return self.compute(key, default, timeout)
+        lock_key = LOCK_KEY.format(key)
+        if cache.add(lock_key, True, self.lock_timeout):
+            try:
+                return self.compute(key, default, timeout)
+            finally:
+                cache.delete(lock_key)
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                self.set_local(key, entry[0])
+                return entry[0]
+        # The lock holder failed, compute the value here
+        return self.compute(key, default, timeout)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.local.pop(key, None)
+        cache.delete_many(keys)
+
+    def clear_local(self):
+        with self.lock:
+            self.local.clear()
+
+
+tiered_cache = TieredCache()
@@ -1,6 +1,12 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from core.metrics import registry
 
 
 def page_not_found(request, exception):
@@ -23,3 +29,22 @@ def permission_denied(request, exception):
 def server_error(request):
     return render(request, 'core/500.html',
                   status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+def has_metrics_token(request):
+    scheme, _, token = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    return bool(
+        settings.METRICS_TOKEN and scheme.lower() == 'bearer'
+        and constant_time_compare(token, settings.METRICS_TOKEN)
+    )
+
+
+def metrics(request):
+    allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    if not (allowed or has_metrics_token(request) or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
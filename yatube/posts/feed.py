@@ -0,0 +1,148 @@
+"""
+Follow feed timelines.
+
+Posts are fanned out on write into ``FeedEntry`` rows of every follower.
+Authors with more than ``FEED_FANOUT_LIMIT`` followers are skipped on
+write and merged into the feed on read instead. When an author stops
+counting as heavy the timelines of the followers are backfilled, the
+feed no longer merges the posts written meanwhile. Posts of a single
+author are read page by page straight from the posts table.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+
+from core.paginator import KeysetPaginator
+from core.tiered import tiered_cache
+from posts.models import FeedEntry, Follow, Post
+
+HEAVY_AUTHORS_KEY = 'feed_heavy_authors'
+HEAVY_AUTHORS_TIMEOUT = 60 * 5
+# Heavy authors of the last computation, compared to find ones leaving
+HEAVY_AUTHORS_SEEN_KEY = 'feed_heavy_authors_seen'
+AUTHOR_PAGE_SIZE = 10
+FOLLOW_FEED_KEYS = ('feed_pub_date', 'feed_post_id')
+
+
+def heavy_authors():
+    """Ids of authors whose posts are fanned out on read."""
+    return tiered_cache.get_or_set(
+        HEAVY_AUTHORS_KEY, find_heavy_authors, HEAVY_AUTHORS_TIMEOUT
+    )
+
+
+def find_heavy_authors():
+    """Heavy authors read from subscriptions, backfilling ones leaving."""
+    heavy = frozenset(
+        Follow.objects.values('author')
+        .annotate(followers=Count('pk'))
+        .filter(followers__gt=settings.FEED_FANOUT_LIMIT)
+        .values_list('author', flat=True)
+    )
+    seen = cache.get(HEAVY_AUTHORS_SEEN_KEY, frozenset())
+    for author_id in seen - heavy:
+        backfill_followers(author_id)
+    # Remembered after the backfill, an interrupted one is run again
+    cache.set(HEAVY_AUTHORS_SEEN_KEY, heavy, None)
+    return heavy
+
+
+def latest_posts(author_id):
+    """``(pk, pub_date)`` of the posts of an author copied on follow."""
+    return list(
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date')
+        .values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_LIMIT]
+    )
+
+
+def build_entries(user_id, author_id, posts=None):
+    """Unsaved timeline entries with the latest posts of an author."""
+    if posts is None:
+        posts = latest_posts(author_id)
+    return [
+        FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    ]
+
+
+def backfill_followers(author_id):
+    """Copy the latest posts of an author into every follower timeline."""
+    posts = latest_posts(author_id)
+    follower_ids = (
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+    )
+    batch = []
+    for user_id in follower_ids.iterator():
+        batch.extend(build_entries(user_id, author_id, posts))
+        if len(batch) >= settings.FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Deliver a new post to the timelines of the author's followers."""
+    if post.author_id in heavy_authors():
+        return
+    follower_ids = (
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=pk, post=post, pub_date=post.pub_date)
+            for pk in follower_ids
+        ),
+        ignore_conflicts=True
+    )
+
+
+def add_author(user_id, author_id):
+    """Backfill a timeline with the posts of a newly followed author."""
+    if author_id in heavy_authors():
+        return
+    FeedEntry.objects.bulk_create(
+        build_entries(user_id, author_id),
+        ignore_conflicts=True
+    )
+
+
+def remove_author(user_id, author_id):
+    """Drop the posts of an unfollowed author from a timeline."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def follow_feed(user):
+    """
+    Posts of the authors followed by the user, to be paginated
+    by ``FOLLOW_FEED_KEYS``.
+    """
+    heavy = heavy_authors()
+    followed_heavy = []
+    if heavy:
+        followed_heavy = list(
+            Follow.objects.filter(user=user, author__in=heavy)
+            .values_list('author', flat=True)
+        )
+    if not followed_heavy:
+        # Ordered by the timeline index instead of sorting the posts
+        return Post.objects.filter(feed_entries__user=user).annotate(
+            feed_pub_date=F('feed_entries__pub_date'),
+            feed_post_id=F('feed_entries__post_id'),
+        )
+    return Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=followed_heavy)
+    ).annotate(feed_pub_date=F('pub_date'), feed_post_id=F('pk'))
+
+
+def author_feed(author, cursor=None):
+    """Keyset page of the author's posts, newest first."""
+    paginator = KeysetPaginator(
+        Post.objects.for_feed().filter(author=author), AUTHOR_PAGE_SIZE
+    )
+    return paginator.get_page(cursor)
@@ -1,7 +1,12 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .images import ingest_image
 from .models import Comment, Group, Post
 
+# Set along with the image, saved whenever the image changes
+IMAGE_DIMENSION_FIELDS = ('image_width', 'image_height', 'image_bytes')
+
 
 class PostForm(forms.ModelForm):
     class Meta:
@@ -16,6 +21,26 @@ class PostForm(forms.ModelForm):
                                         f"'{data}' не существует")
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if not isinstance(image, UploadedFile):
+            # Kept or cleared image
+            if not image:
+                self.instance.image_width = None
+                self.instance.image_height = None
+                self.instance.image_bytes = None
+            return image
+        try:
+            image = ingest_image(image)
+        except (OSError, ValueError):
+            raise forms.ValidationError(
+                'Не удалось обработать изображение'
+            )
+        self.instance.image_width = image.width
+        self.instance.image_height = image.height
+        self.instance.image_bytes = image.size
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
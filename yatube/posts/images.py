@@ -0,0 +1,71 @@
+"""
+Ingest of uploaded post images.
+
+An upload is decoded once, turned upright, downscaled to at most
+``POST_IMAGE_MAX_SIZE`` pixels on the longest side and re-encoded to
+``POST_IMAGE_FORMAT`` without EXIF and other metadata. Stored originals
+stay small and thumbnails never decode camera-sized files. The result
+is written to a temporary file, not kept in memory.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, ImageOps
+
+EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+# Background of transparent images re-encoded to JPEG
+BACKGROUND = (255, 255, 255)
+
+
+class IngestedImage(File):
+    """Re-encoded image file with its dimensions."""
+
+    def __init__(self, file, name, width, height):
+        super().__init__(file, name)
+        self.width = width
+        self.height = height
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def convert(image, image_format):
+    """Image in a mode the format stores, transparency kept if it can."""
+    if not has_alpha(image):
+        return image.convert('RGB')
+    image = image.convert('RGBA')
+    if image_format != 'JPEG':
+        return image
+    flat = Image.new('RGB', image.size, BACKGROUND)
+    flat.paste(image, mask=image.getchannel('A'))
+    return flat
+
+
+def ingest_image(upload):
+    """Downscaled and re-encoded copy of an uploaded image."""
+    image_format = settings.POST_IMAGE_FORMAT
+    limit = settings.POST_IMAGE_MAX_SIZE
+    upload.seek(0)
+    with Image.open(upload) as original:
+        # JPEG is decoded right at a reduced scale
+        original.draft('RGB', (limit, limit))
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        image = convert(image, image_format)
+    output = tempfile.TemporaryFile()
+    options = {'quality': settings.POST_IMAGE_QUALITY}
+    if image_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    else:
+        options.update(method=6)
+    image.save(output, image_format, **options)
+    output.seek(0)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return IngestedImage(
+        output, stem + EXTENSIONS[image_format], *image.size
+    )
@@ -0,0 +1,105 @@
+"""
+Like counters.
+
+A like is toggled in one transaction and ``Post.likes`` is changed with
+a single ``UPDATE ... SET likes = likes + 1``, so concurrent clicks never
+lose updates. With ``LIKES_BUFFER_SHARDS`` set the counter updates of
+hot posts are buffered in sharded cache counters instead and written to
+the database by ``flush_likes``.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from posts.models import Like, Post
+
+DELTA_KEY = 'likes_delta:{}:{}'
+PENDING_KEY = 'likes_pending:{}'
+DIRTY_KEY = 'likes_dirty:{}'
+DIRTY_SEQUENCE_KEY = 'likes_dirty_sequence'
+FLUSHED_SEQUENCE_KEY = 'likes_flushed_sequence'
+
+
+def toggle_like(user, post_id):
+    """Like or unlike the post, return True when it ends up liked."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+        if deleted:
+            change_likes(post_id, -1)
+            return False
+        try:
+            with transaction.atomic():
+                Like.objects.create(user=user, post_id=post_id)
+        except IntegrityError:
+            # A concurrent request has liked the post and counted it
+            return True
+        change_likes(post_id, 1)
+        return True
+
+
+def change_likes(post_id, delta):
+    if settings.LIKES_BUFFER_SHARDS:
+        transaction.on_commit(lambda: buffer_likes(post_id, delta))
+    else:
+        Post.objects.filter(pk=post_id).update(likes=F('likes') + delta)
+
+
+def incr(key, delta):
+    cache.add(key, 0, None)
+    return cache.incr(key, delta)
+
+
+def buffer_likes(post_id, delta):
+    """Add delta to a random shard and register the post for flushing."""
+    shard = random.randrange(settings.LIKES_BUFFER_SHARDS)
+    incr(DELTA_KEY.format(post_id, shard), delta)
+    register(post_id)
+
+
+def register(post_id):
+    """Mark the post for flushing unless it is marked already."""
+    if cache.add(PENDING_KEY.format(post_id), True, None):
+        sequence = incr(DIRTY_SEQUENCE_KEY, 1)
+        cache.set(DIRTY_KEY.format(sequence), post_id, None)
+
+
+def pending_likes(post_id):
+    """Buffered likes of the post not yet written to the database."""
+    keys = [
+        DELTA_KEY.format(post_id, shard)
+        for shard in range(settings.LIKES_BUFFER_SHARDS)
+    ]
+    return sum(cache.get_many(keys).values())
+
+
+def flush_likes():
+    """Write buffered likes to the database, return flushed post ids."""
+    last = cache.get(DIRTY_SEQUENCE_KEY, 0)
+    first = cache.get(FLUSHED_SEQUENCE_KEY, 0) + 1
+    dirty_keys = [
+        DIRTY_KEY.format(number) for number in range(first, last + 1)
+    ]
+    post_ids = set(cache.get_many(dirty_keys).values())
+    for post_id in post_ids:
+        # Unregister before reading, so likes buffered meanwhile
+        # register the post again instead of being lost
+        cache.delete(PENDING_KEY.format(post_id))
+        delta = 0
+        for shard in range(settings.LIKES_BUFFER_SHARDS):
+            key = DELTA_KEY.format(post_id, shard)
+            value = cache.get(key, 0)
+            if value:
+                cache.decr(key, value)
+                delta += value
+        if delta:
+            Post.objects.filter(pk=post_id).update(likes=F('likes') + delta)
+        # Likes buffered between unregistering and draining may have
+        # found the post still registered, register it for the next run
+        if pending_likes(post_id):
+            register(post_id)
+    cache.delete_many(dirty_keys)
+    cache.set(FLUSHED_SEQUENCE_KEY, last, None)
+    return post_ids
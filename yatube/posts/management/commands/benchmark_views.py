@@ -0,0 +1,124 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment
+)
+
+from benchmarks.runner import Runner, compare
+from benchmarks.scenarios import build_scenarios
+
+DATASET = {
+    'users': 500,
+    'groups': 20,
+    'posts': 10000,
+    'comments': 10000,
+    'follows': 5000,
+    'likes': 20000,
+    'seed': 1,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the posts views on a seeded test database '
+        'and report latency, queries and memory per request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument(
+            '--scale', type=float, default=1.0,
+            help='Multiplier of the dataset size'
+        )
+        parser.add_argument(
+            '--scenario', dest='scenarios', action='append', default=[],
+            help='Run only this scenario'
+        )
+        parser.add_argument(
+            '--clear-cache', action='store_true',
+            help='Clear the cache before every request'
+        )
+        parser.add_argument(
+            '--output', help='Write the JSON report to this file'
+        )
+        parser.add_argument(
+            '--compare', help='JSON report of a previous run to compare with'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('At least one iteration is required')
+        dataset = {
+            name: value if name == 'seed' else int(value * options['scale'])
+            for name, value in DATASET.items()
+        }
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            cache.clear()
+            call_command('seed_yatube', stdout=self.stderr, **dataset)
+            scenarios = build_scenarios()
+            if options['scenarios']:
+                scenarios = [
+                    scenario for scenario in scenarios
+                    if scenario.name in options['scenarios']
+                ]
+            runner = Runner(
+                options['iterations'], options['warmup'],
+                options['clear_cache']
+            )
+            results = runner.run(scenarios)
+            vendor = connection.vendor
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            cache.clear()
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': vendor,
+                'dataset': dataset,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'clear_cache': options['clear_cache'],
+            },
+            'scenarios': results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)['scenarios']
+            self.write_comparison(compare(baseline, results))
+
+    def write_comparison(self, changes):
+        self.stderr.write('Latency p50, ms: baseline -> current')
+        for name, (before, after, change) in changes.items():
+            self.stderr.write(
+                f'{name:<22} {before:>9.3f} -> {after:>9.3f} {change:>+8.1%}'
+            )
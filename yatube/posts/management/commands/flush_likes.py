@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.likes import flush_likes
+from posts.models import Post
+from posts.signals import bump_post
+
+
+class Command(BaseCommand):
+    help = 'Write like counters buffered in the cache to the database'
+
+    def handle(self, *args, **options):
+        post_ids = flush_likes()
+        for post in Post.objects.filter(pk__in=post_ids).only(
+            'author', 'group'
+        ):
+            bump_post(post, followers=False)
+        self.stdout.write(self.style.SUCCESS(
+            f'Like counters flushed for posts: {len(post_ids)}'
+        ))
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails of all post images in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Number of worker threads, 1 generates sequentially'
+        )
+
+    def generate(self, image):
+        try:
+            generate_thumbnails(image)
+            return True
+        except Exception as error:
+            self.stderr.write(f'{image}: {error}')
+            return False
+
+    def generate_in_thread(self, image):
+        try:
+            return self.generate(image)
+        finally:
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        images = {
+            post.image.name: post.image
+            for post in Post.objects.exclude(image='').only('image')
+        }
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as executor:
+                results = list(
+                    executor.map(self.generate_in_thread, images.values())
+                )
+        else:
+            results = [self.generate(image) for image in images.values()]
+        self.stdout.write(self.style.SUCCESS(
+            f'Thumbnails generated for images: {sum(results)} '
+            f'of {len(results)}'
+        ))
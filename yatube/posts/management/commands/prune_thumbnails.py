@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.thumbnails import prune
+
+
+class Command(BaseCommand):
+    help = 'Evict least recently used thumbnails above the store size cap'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-bytes', type=int,
+            default=settings.THUMBNAIL_STORE_MAX_BYTES,
+            help='Size of the thumbnail store to prune down to'
+        )
+
+    def handle(self, *args, **options):
+        deleted, total = prune(options['max_bytes'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Thumbnails evicted: {deleted}, store size: {total} bytes'
+        ))
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.feed import heavy_authors
+from posts.models import FeedEntry, Follow, Post, User
+
+# Authors whose posts are read in one query, below SQLite's 999 params
+AUTHORS_PER_QUERY = 500
+
+
+class Command(BaseCommand):
+    help = 'Rebuild follow feed timelines from subscriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', dest='users', action='append', default=[],
+            help='Rebuild only the timeline of this username'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.FEED_BATCH_SIZE,
+            help='Number of posts read per query chunk'
+        )
+
+    def handle(self, *args, **options):
+        heavy = heavy_authors()
+        users = User.objects.filter(
+            pk__in=Follow.objects.values('user')
+        ) | User.objects.filter(pk__in=FeedEntry.objects.values('user'))
+        if options['users']:
+            users = users.filter(username__in=options['users'])
+        created = 0
+        user_ids = users.order_by('pk').values_list('pk', flat=True)
+        for user_id in user_ids.iterator():
+            created += self.rebuild(user_id, heavy, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Timelines rebuilt, entries written: {created}'
+        ))
+
+    def rebuild(self, user_id, heavy, batch_size):
+        """Replace a timeline at once, readers never see it empty."""
+        author_ids = list(
+            Follow.objects.filter(user_id=user_id)
+            .exclude(author__in=heavy).values_list('author_id', flat=True)
+        )
+        entries = []
+        for start in range(0, len(author_ids), AUTHORS_PER_QUERY):
+            entries.extend(
+                FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in self.latest_posts(
+                    author_ids[start:start + AUTHORS_PER_QUERY], batch_size
+                )
+            )
+        with transaction.atomic():
+            FeedEntry.objects.filter(user_id=user_id).delete()
+            # Django picks the largest batch the database accepts
+            FeedEntry.objects.bulk_create(entries)
+        return len(entries)
+
+    @staticmethod
+    def latest_posts(author_ids, batch_size):
+        """``(pk, pub_date)`` of the latest posts of each author."""
+        posts = (
+            Post.objects.filter(author_id__in=author_ids)
+            .order_by('author_id', '-pub_date')
+            .values_list('author_id', 'pk', 'pub_date')
+        )
+        counts = dict.fromkeys(author_ids, 0)
+        for author_id, pk, pub_date in posts.iterator(chunk_size=batch_size):
+            if counts[author_id] < settings.FEED_BACKFILL_LIMIT:
+                counts[author_id] += 1
+                yield pk, pub_date
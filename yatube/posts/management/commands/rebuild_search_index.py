@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of posts indexed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        backend = get_backend()
+        backend.clear()
+        posts = Post.objects.order_by('pk').values_list('pk', 'text')
+        batch = []
+        total = 0
+        for post in posts.iterator(chunk_size=batch_size):
+            batch.append(post)
+            if len(batch) == batch_size:
+                total += self.index(backend, batch)
+                batch = []
+        total += self.index(backend, batch)
+        self.stdout.write(self.style.SUCCESS(f'Posts indexed: {total}'))
+
+    @staticmethod
+    def index(backend, batch):
+        with transaction.atomic():
+            backend.index(batch)
+        return len(batch)
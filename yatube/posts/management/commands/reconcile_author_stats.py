@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.stats import compute_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount denormalized statistics of all authors'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of authors recounted per transaction'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        author_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        total = 0
+        for pk in author_ids.iterator(chunk_size=batch_size):
+            batch.append(pk)
+            if len(batch) == batch_size:
+                total += len(compute_stats(batch))
+                batch = []
+        if batch:
+            total += len(compute_stats(batch))
+        self.stdout.write(self.style.SUCCESS(
+            f'Statistics reconciled for authors: {total}'
+        ))
@@ -0,0 +1,311 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from faker import Faker
+
+from posts.models import Comment, Follow, Group, Like, Post, User
+
+# Multiplier of a cheap permutation spreading hot posts over the timeline
+PERMUTATION_PRIME = 1_000_003
+
+
+@contextmanager
+def explicit_pub_dates(*models):
+    """Let bulk_create save generated pub_date instead of now."""
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def zipf_weights(size, exponent):
+    """Cumulative weights of ranks 1..size, the first ones are hot."""
+    return list(
+        accumulate(1 / rank ** exponent for rank in range(1, size + 1))
+    )
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with generated data for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--likes', type=int, default=50000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Posts are spread over this number of last days'
+        )
+        parser.add_argument(
+            '--authors-exponent', type=float, default=1.1,
+            help='Zipf exponent of posts and followers per author'
+        )
+        parser.add_argument(
+            '--hot-posts-exponent', type=float, default=1.2,
+            help='Zipf exponent of likes and comments per post'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--password', default='password',
+            help='Password of every generated user'
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Do not rebuild feeds, author statistics and search index'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        Faker.seed(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.batch_size = options['batch_size']
+        self.report = []
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+        options['follows'] = min(
+            options['follows'], options['users'] * (options['users'] - 1)
+        )
+        models = (User, Group, Post, Comment, Follow, Like)
+        with explicit_pub_dates(Group, Post, Comment, Follow, Like):
+            self.users = self.seed_users(options['users'], options['password'])
+            self.groups = self.insert(
+                Group, self.generate_groups(options['groups'])
+            )
+            self.author_weights = zipf_weights(
+                len(self.users), options['authors_exponent']
+            )
+            self.posts_first = next_id(Post)
+            self.posts_total = options['posts']
+            self.posts = self.insert(
+                Post, self.generate_posts(options['posts'])
+            )
+            self.post_weights = zipf_weights(
+                self.posts_total, options['hot_posts_exponent']
+            )
+            self.insert(Comment, self.generate_comments(options['comments']))
+            self.insert(Follow, self.generate_follows(options['follows']))
+            self.insert(Like, self.generate_likes(options['likes']))
+        self.timed('Post counters', self.count_related)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        if not options['skip_derived']:
+            derived = (
+                ('rebuild_feeds', {'batch_size': self.batch_size}),
+                ('reconcile_author_stats', {}),
+                ('rebuild_search_index', {}),
+            )
+            for command, command_options in derived:
+                self.timed(command, lambda: call_command(
+                    command, stdout=self.stdout, stderr=self.stderr,
+                    **command_options
+                ))
+            cache.clear()
+        self.write_report()
+
+    def insert(self, model, objects):
+        """Save objects in batched transactions, return their ids."""
+        first_id = next_id(model)
+        objects = iter(objects)
+        count = 0
+        started = time.monotonic()
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            for number, obj in enumerate(batch, start=first_id + count):
+                obj.pk = number
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            count += len(batch)
+        self.report.append(
+            (model.__name__, count, time.monotonic() - started)
+        )
+        return range(first_id, first_id + count)
+
+    def timed(self, name, function):
+        started = time.monotonic()
+        function()
+        self.report.append((name, None, time.monotonic() - started))
+
+    def write_report(self):
+        total_rows = sum(rows or 0 for name, rows, seconds in self.report)
+        total_seconds = sum(seconds for name, rows, seconds in self.report)
+        for name, rows, seconds in self.report:
+            if rows is None:
+                self.stdout.write(f'{name:<22} {seconds:>9.2f} s')
+            else:
+                self.stdout.write(
+                    f'{name:<22} {seconds:>9.2f} s {rows:>10} rows '
+                    f'{rows / max(seconds, 1e-9):>10.0f} rows/s'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {total_rows} rows in {total_seconds:.2f} s, '
+            f'{total_rows / max(total_seconds, 1e-9):.0f} rows/s'
+        ))
+
+    def seed_users(self, number, password):
+        # Hashing is the slowest part of creating users, share one hash
+        password = make_password(password)
+        first_id = next_id(User)
+        names = [
+            (self.fake.user_name(), self.fake.first_name(),
+             self.fake.last_name(), self.fake.free_email_domain())
+            for _ in range(1000)
+        ]
+        users = (
+            User(
+                username=f'{username}_{first_id + index}',
+                first_name=first_name,
+                last_name=last_name,
+                email=f'{username}_{first_id + index}@{domain}',
+                password=password,
+            ) for index, (username, first_name, last_name, domain) in (
+                (index, self.random.choice(names)) for index in range(number)
+            )
+        )
+        return self.insert(User, users)
+
+    def random_date(self, start=None):
+        start = start or self.start
+        return start + (self.now - start) * self.random.random()
+
+    def post_date(self, index):
+        """Posts are published evenly over the period in order of ids."""
+        position = (index + 1) / (self.posts_total + 1)
+        return self.start + (self.now - self.start) * position
+
+    def hot_posts(self, number):
+        """Indexes of posts, a few hot posts are drawn most of the time."""
+        ranks = self.random.choices(
+            range(self.posts_total), cum_weights=self.post_weights, k=number
+        )
+        return [
+            rank * PERMUTATION_PRIME % self.posts_total for rank in ranks
+        ]
+
+    def batches(self, number):
+        while number > 0:
+            size = min(number, self.batch_size)
+            yield size
+            number -= size
+
+    def generate_groups(self, number):
+        first_id = next_id(Group)
+        for index in range(number):
+            yield Group(
+                title=self.fake.catch_phrase()[:200],
+                description=self.fake.paragraph(),
+                slug=f'group-{first_id + index}',
+                pub_date=self.random_date(),
+            )
+
+    def generate_posts(self, number):
+        texts = [self.fake.paragraph(nb_sentences=5) for _ in range(1000)]
+        index = 0
+        for size in self.batches(number):
+            authors = self.random.choices(
+                self.users, cum_weights=self.author_weights, k=size
+            )
+            for author_id in authors:
+                group_id = None
+                if self.groups and self.random.random() < 0.5:
+                    group_id = self.random.choice(self.groups)
+                yield Post(
+                    text=self.random.choice(texts),
+                    author_id=author_id,
+                    group_id=group_id,
+                    pub_date=self.post_date(index),
+                )
+                index += 1
+
+    def generate_comments(self, number):
+        if not self.posts_total:
+            return
+        texts = [self.fake.sentence() for _ in range(1000)]
+        for size in self.batches(number):
+            for index in self.hot_posts(size):
+                yield Comment(
+                    text=self.random.choice(texts),
+                    author_id=self.random.choice(self.users),
+                    post_id=self.posts_first + index,
+                    pub_date=self.random_date(self.post_date(index)),
+                )
+
+    def generate_follows(self, number):
+        seen = set()
+        while len(seen) < number:
+            size = min(number - len(seen), self.batch_size)
+            authors = self.random.choices(
+                self.users, cum_weights=self.author_weights, k=size
+            )
+            for author_id in authors:
+                user_id = self.random.choice(self.users)
+                pair = (user_id, author_id)
+                if user_id == author_id or pair in seen:
+                    continue
+                seen.add(pair)
+                yield Follow(
+                    user_id=user_id,
+                    author_id=author_id,
+                    pub_date=self.random_date(),
+                )
+
+    def generate_likes(self, number):
+        if not self.posts_total:
+            return
+        number = min(number, self.posts_total * len(self.users))
+        seen = set()
+        while len(seen) < number:
+            size = min(number - len(seen), self.batch_size)
+            for index in self.hot_posts(size):
+                pair = (self.random.choice(self.users), index)
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                yield Like(
+                    user_id=pair[0],
+                    post_id=self.posts_first + index,
+                    pub_date=self.random_date(self.post_date(index)),
+                )
+
+    def count_related(self):
+        """Set like and comment counters of the generated posts."""
+        counters = {
+            'likes': Like.objects.filter(post=OuterRef('pk')),
+            'comments_count': Comment.objects.filter(post=OuterRef('pk')),
+        }
+        Post.objects.filter(
+            pk__gte=self.posts.start, pk__lt=self.posts.stop
+        ).update(**{
+            field: Coalesce(Subquery(
+                related.order_by().values('post')
+                .annotate(count=Count('pk')).values('count'),
+                output_field=IntegerField()
+            ), 0)
+            for field, related in counters.items()
+        })
@@ -24,6 +24,17 @@ class Group(CreateModel):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Posts with the author and group columns used by post cards."""
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'image', 'image_width', 'image_height',
+            'likes', 'comments_count',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__title', 'group__slug',
+        )
+
+
 class Post(CreateModel):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -50,22 +61,66 @@ class Post(CreateModel):
         blank=True,
         help_text='Загрузить изображение'
     )
+    # Recorded on upload, pages never open the file to lay it out
+    image_width = models.PositiveIntegerField(
+        verbose_name='Ширина изображения',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        verbose_name='Высота изображения',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_bytes = models.PositiveIntegerField(
+        verbose_name='Размер изображения',
+        blank=True,
+        null=True,
+        editable=False
+    )
     likes = models.IntegerField(
         verbose_name='Лайки',
         blank=True,
         null=True,
         default=0
     )
+    comments_count = models.IntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
 
 
+class CommentQuerySet(models.QuerySet):
+    def for_display(self):
+        """Comments with the author columns used by comment lists."""
+        return self.select_related('author').only(
+            'text', 'pub_date', 'post', 'author__username',
+        )
+
+
 class Comment(CreateModel):
     text = models.TextField(
         verbose_name='Текст комментария',
@@ -82,10 +137,18 @@ class Comment(CreateModel):
         related_name='comments'
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=['post', '-pub_date', '-id'],
+                name='comment_post_pub_date_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -114,6 +177,11 @@ class Follow(CreateModel):
                 fields=['author', 'user'], name='unique_follow'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=['user', 'author'], name='follow_user_author_idx'
+            ),
+        )
 
 
 class Like(CreateModel):
@@ -136,6 +204,81 @@ class Like(CreateModel):
         ordering = ('post',)
         constraints = (
             models.UniqueConstraint(
-                fields=['post', 'user'], name='unique_follow'
+                fields=['post', 'user'], name='unique_like'
+            ),
+        )
+        indexes = (
+            models.Index(fields=['user', 'post'], name='like_user_post_idx'),
+        )
+
+
+class FeedEntry(CreateModel):
+    """
+    Materialized follow feed: a post delivered to a follower's timeline
+    """
+    # Copy of the post date, timelines are read in order of the index
+    pub_date = models.DateTimeField(verbose_name='Дата публикации поста')
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ('-pub_date',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'
             ),
         )
+
+
+class AuthorStats(models.Model):
+    """
+    Counters of an author maintained by signals
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+    followers_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
+    following_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество подписок'
+    )
+    likes_count = models.IntegerField(
+        default=0,
+        verbose_name='Получено лайков'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return str(self.author)
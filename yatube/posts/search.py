@@ -0,0 +1,174 @@
+"""
+Full-text search over posts.
+
+Post texts are indexed as Russian stems. On SQLite they are kept in an
+FTS5 table and ranked by bm25, other databases fall back to scanning
+post texts, newest first. A post must match every term of the query,
+so stop words and words of one or two letters are dropped from it.
+Results are paginated by a keyset over ``(score, post id)`` where
+a lower score is a better match.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from core.paginator import (
+    InvalidCursor, KeysetPage, decode_token, encode_token
+)
+from posts.models import Post
+from posts.stemmer import stem_words
+
+FTS_TABLE = 'posts_post_fts'
+
+STOP_WORDS = frozenset((
+    'без', 'более', 'бы', 'был', 'была', 'были', 'было', 'быть', 'вам',
+    'вас', 'весь', 'во', 'вот', 'все', 'всего', 'всех', 'вы', 'где', 'да',
+    'даже', 'для', 'до', 'его', 'ее', 'если', 'есть', 'еще', 'же', 'за',
+    'здесь', 'из', 'или', 'им', 'их', 'как', 'когда', 'ко', 'кто', 'ли',
+    'либо', 'мне', 'может', 'мы', 'на', 'над', 'надо', 'наш', 'не', 'него',
+    'нее', 'нет', 'ни', 'них', 'но', 'ну', 'об', 'однако', 'он', 'она',
+    'они', 'оно', 'от', 'очень', 'по', 'под', 'при', 'про', 'с', 'со',
+    'так', 'также', 'такой', 'там', 'те', 'тем', 'то', 'того', 'тоже',
+    'той', 'только', 'том', 'ты', 'уже', 'хотя', 'чего', 'чей', 'чем',
+    'что', 'чтобы', 'эта', 'эти', 'это', 'этот', 'я',
+))
+
+
+def search_terms(query):
+    """Stems of the query words which narrow the search."""
+    words = [
+        word for word in re.findall(r'\w+', query.lower().replace('ё', 'е'))
+        if word not in STOP_WORDS and not (word.isalpha() and len(word) < 3)
+    ]
+    return stem_words(' '.join(words))
+
+
+class SearchBackend:
+    def index(self, posts):
+        """Index ``(pk, text)`` pairs, replacing previous entries."""
+        raise NotImplementedError
+
+    def remove(self, post_ids):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, terms, after, limit):
+        """``(score, pk)`` of posts matching all terms, after the pair."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+
+    def index(self, posts):
+        rows = [(pk, ' '.join(stem_words(text))) for pk, text in posts]
+        self.remove([pk for pk, content in rows])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, content) VALUES (%s, %s)',
+                rows
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in post_ids]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, terms, after, limit):
+        sql = (
+            f'SELECT score, rowid FROM ('
+            f'SELECT rowid, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        )
+        params = [' '.join(f'"{term}"*' for term in terms)]
+        if after is not None:
+            sql += ' WHERE (score, rowid) > (%s, %s)'
+            params.extend(after)
+        sql += ' ORDER BY score, rowid LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class DatabaseBackend(SearchBackend):
+    """Index-less fallback, scores are negated post ids."""
+
+    def index(self, posts):
+        pass
+
+    def remove(self, post_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, terms, after, limit):
+        posts = Post.objects.all()
+        for term in terms:
+            posts = posts.filter(text__icontains=term)
+        if after is not None:
+            posts = posts.filter(pk__lt=-after[0])
+        post_ids = posts.order_by('-pk').values_list('pk', flat=True)
+        return [(-pk, pk) for pk in post_ids[:limit]]
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    if settings.POSTS_SEARCH_BACKEND:
+        return import_string(settings.POSTS_SEARCH_BACKEND)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return DatabaseBackend()
+
+
+class SearchPaginator:
+    """Forward only keyset pagination of search results."""
+    last_cursor = None
+
+    def __init__(self, query, per_page):
+        self.terms = search_terms(query)
+        self.per_page = int(per_page)
+
+    def get_page(self, cursor=None):
+        after = None
+        if cursor:
+            try:
+                score, pk = decode_token(cursor)
+                after = (float(score), int(pk))
+            except (InvalidCursor, ValueError, TypeError):
+                pass
+        hits = []
+        if self.terms:
+            hits = get_backend().search(self.terms, after, self.per_page + 1)
+        next_cursor = None
+        if len(hits) > self.per_page:
+            hits = hits[:self.per_page]
+            next_cursor = encode_token(list(hits[-1]))
+        posts = Post.objects.for_feed().in_bulk([pk for score, pk in hits])
+        rows = [posts[pk] for score, pk in hits if pk in posts]
+        return SearchPage(rows, self, next_cursor, after is not None)
+
+
+class SearchPage(KeysetPage):
+    previous_cursor = None
+
+    def __init__(self, object_list, paginator, next_cursor, has_previous):
+        super().__init__(
+            object_list, paginator, next_cursor is not None, has_previous
+        )
+        self._next_cursor = next_cursor
+
+    @property
+    def next_cursor(self):
+        return self._next_cursor
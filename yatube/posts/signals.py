@@ -0,0 +1,118 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.cache import bump, namespace
+from posts import feed
+from posts.models import Comment, Follow, Group, Like, Post
+from posts.search import get_backend
+from posts.stats import change_stats
+
+HEAVY_FOLLOW_NAMESPACE = namespace('follow', 'heavy')
+
+
+def bump_post(post, followers=True):
+    """Invalidate cached fragments which render the post."""
+    namespaces = {
+        'index',
+        namespace('author', post.author_id),
+        namespace('post', post.pk),
+    }
+    for group_id in (post.group_id, getattr(post, '_loaded_group_id', None)):
+        if group_id is not None:
+            namespaces.add(namespace('group', group_id))
+    if followers:
+        if post.author_id in feed.heavy_authors():
+            namespaces.add(HEAVY_FOLLOW_NAMESPACE)
+        else:
+            namespaces.update(
+                namespace('follow', pk) for pk in
+                Follow.objects.filter(author_id=post.author_id)
+                .values_list('user_id', flat=True)
+            )
+    bump(*namespaces)
+
+
+@receiver(post_init, sender=Post)
+def post_remember_group(sender, instance, **kwargs):
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out_post(instance)
+        change_stats(instance.author_id, posts_count=1)
+    get_backend().index([(instance.pk, instance.text)])
+    bump_post(instance)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_invalidate(sender, instance, **kwargs):
+    change_stats(instance.author_id, posts_count=-1)
+    get_backend().remove([instance.pk])
+    bump_post(instance)
+
+
+def like_changed(like, delta):
+    post = (
+        Post.objects.filter(pk=like.post_id)
+        .only('author', 'group').first()
+    )
+    if post is not None:
+        change_stats(post.author_id, likes_count=delta)
+        bump_post(post, followers=False)
+
+
+@receiver(post_save, sender=Like)
+def like_saved(sender, instance, created, **kwargs):
+    if created:
+        like_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Like)
+def like_deleted(sender, instance, **kwargs):
+    like_changed(instance, -1)
+
+
+@receiver(post_save, sender=Group)
+def group_invalidate(sender, instance, **kwargs):
+    bump(namespace('group', instance.pk))
+
+
+def comment_changed(comment, delta):
+    Post.objects.filter(pk=comment.post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+    bump(namespace('comments', comment.post_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        comment_changed(instance, 1)
+    else:
+        bump(namespace('comments', instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    comment_changed(instance, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_add_to_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.add_author(instance.user_id, instance.author_id)
+        change_stats(instance.author_id, followers_count=1)
+        change_stats(instance.user_id, following_count=1)
+    bump(namespace('follow', instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_remove_from_feed(sender, instance, **kwargs):
+    feed.remove_author(instance.user_id, instance.author_id)
+    change_stats(instance.author_id, followers_count=-1)
+    change_stats(instance.user_id, following_count=-1)
+    bump(namespace('follow', instance.user_id))
@@ -0,0 +1,74 @@
+"""
+Denormalized author statistics.
+
+Counters are changed incrementally by signals and computed from scratch
+for authors without a row yet or by ``reconcile_author_stats``. Reads
+go through the two-level cache, changes delete the cached statistics.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from core.tiered import tiered_cache
+from posts.models import AuthorStats, Follow, Like, Post
+
+STATS_KEY = 'author_stats:{}'
+STATS_TIMEOUT = 60 * 60
+
+
+def count_by(queryset, field, author_ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': author_ids})
+        .order_by()
+        .values_list(field)
+        .annotate(count=Count('pk'))
+    )
+
+
+def compute_stats(author_ids):
+    """Recount and save statistics of the authors."""
+    author_ids = list(author_ids)
+    posts = count_by(Post.objects, 'author', author_ids)
+    followers = count_by(Follow.objects, 'author', author_ids)
+    following = count_by(Follow.objects, 'user', author_ids)
+    likes = count_by(Like.objects, 'post__author', author_ids)
+    stats = [
+        AuthorStats(
+            author_id=pk,
+            posts_count=posts.get(pk, 0),
+            followers_count=followers.get(pk, 0),
+            following_count=following.get(pk, 0),
+            likes_count=likes.get(pk, 0),
+        ) for pk in author_ids
+    ]
+    with transaction.atomic():
+        AuthorStats.objects.filter(author_id__in=author_ids).delete()
+        AuthorStats.objects.bulk_create(stats, ignore_conflicts=True)
+    tiered_cache.delete(*(STATS_KEY.format(pk) for pk in author_ids))
+    return stats
+
+
+def change_stats(author_id, **deltas):
+    """
+    Add deltas to the counters of the author.
+    Missing statistics are left to be computed on first access.
+    """
+    AuthorStats.objects.filter(author_id=author_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    tiered_cache.delete(STATS_KEY.format(author_id))
+
+
+def load_stats(author_id):
+    try:
+        return AuthorStats.objects.get(author_id=author_id)
+    except AuthorStats.DoesNotExist:
+        return compute_stats([author_id])[0]
+
+
+def get_stats(author):
+    """Statistics of the author, computed on first access."""
+    return tiered_cache.get_or_set(
+        STATS_KEY.format(author.pk),
+        lambda: load_stats(author.pk),
+        STATS_TIMEOUT
+    )
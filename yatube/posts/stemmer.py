@@ -0,0 +1,99 @@
+"""
+Snowball stemmer for Russian words.
+
+See https://snowballstem.org/algorithms/russian/stemmer.html
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = re.compile(
+    r'(?:ив|ивши|ившись|ыв|ывши|ывшись|(?<=[ая])(?:в|вши|вшись))$'
+)
+REFLEXIVE = re.compile(r'(?:ся|сь)$')
+ADJECTIVE = re.compile(
+    r'(?:ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому'
+    r'|их|ых|ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'(?:ивш|ывш|ующ|(?<=[ая])(?:ем|нн|вш|ющ|щ))$')
+VERB = re.compile(
+    r'(?:ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю'
+    r'|(?<=[ая])(?:ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно))$'
+)
+NOUN = re.compile(
+    r'(?:а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием'
+    r'|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+SUPERLATIVE = re.compile(r'(?:ейше|ейш)$')
+DERIVATIONAL = re.compile(r'(?:ость|ост)$')
+
+
+def region(word, start=0):
+    """Start of the region after the first non-vowel following a vowel."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def cut(pattern, word):
+    """Word without the longest ending matching the pattern or None."""
+    match = pattern.search(word)
+    if match is None:
+        return None
+    return word[:match.start()]
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    for index, letter in enumerate(word):
+        if letter in VOWELS:
+            rv_start = index + 1
+            break
+    else:
+        return word
+    r2_start = region(word, region(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Step 1
+    stripped = cut(PERFECTIVE_GERUND, rv)
+    if stripped is None:
+        reflexive = cut(REFLEXIVE, rv)
+        if reflexive is not None:
+            rv = reflexive
+        stripped = cut(ADJECTIVE, rv)
+        if stripped is not None:
+            participle = cut(PARTICIPLE, stripped)
+            stripped = stripped if participle is None else participle
+        else:
+            stripped = cut(VERB, rv)
+            if stripped is None:
+                stripped = cut(NOUN, rv)
+    if stripped is not None:
+        rv = stripped
+
+    # Step 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Step 3
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+
+    # Step 4
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        stripped = cut(SUPERLATIVE, rv)
+        if stripped is not None:
+            rv = stripped[:-1] if stripped.endswith('нн') else stripped
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def stem_words(text):
+    """Stems of all words of the text."""
+    return [stem(word) for word in re.findall(r'\w+', text.lower())]
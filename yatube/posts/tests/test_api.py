@@ -0,0 +1,182 @@
+import json
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Тестовый автор')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='test-slug'
+        )
+        now = timezone.now()
+        Post.objects.bulk_create(
+            Post(
+                text=f'Тестовый пост {number}',
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                pub_date=now - timedelta(minutes=number),
+            ) for number in range(25)
+        )
+        cls.post = Post.objects.latest('pub_date')
+        Comment.objects.create(
+            text='Тестовый комментарий', author=cls.author, post=cls.post
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_pages(self):
+        """
+        Posts are paged newest first by cursor
+        """
+        address = reverse('api:posts')
+        first = self.client.get(address, {'limit': 10}).json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(first['results'][0]['id'], ApiTest.post.pk)
+        self.assertIsNone(first['previous_cursor'])
+        ids = [post['id'] for post in first['results']]
+        cursor = first['next_cursor']
+        while cursor:
+            page = self.client.get(
+                address, {'limit': 10, 'cursor': cursor}
+            ).json()
+            ids.extend(post['id'] for post in page['results'])
+            cursor = page['next_cursor']
+        self.assertEqual(
+            ids,
+            list(Post.objects.order_by('-pub_date').values_list(
+                'pk', flat=True
+            ))
+        )
+
+    def test_fields(self):
+        """
+        Fieldsets return only the requested fields, all by default
+        """
+        address = reverse('api:post_detail', args=(ApiTest.post.pk,))
+        self.assertEqual(
+            self.client.get(address).json(),
+            {
+                'id': ApiTest.post.pk,
+                'text': ApiTest.post.text,
+                'pub_date': ApiTest.post.pub_date.isoformat(),
+                'author': ApiTest.author.username,
+                'group': None,
+                'image': None,
+                'likes': 0,
+                'comments_count': 1,
+            }
+        )
+        self.assertEqual(
+            self.client.get(address, {'fields': 'id,author'}).json(),
+            {'id': ApiTest.post.pk, 'author': ApiTest.author.username}
+        )
+        response = self.client.get(address, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_fields_select_columns(self):
+        """
+        Sparse fieldsets neither join nor read unused columns
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('api:posts'), {'fields': 'id,likes'})
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"text"', sql)
+        # Authors and groups of all fields are joined into one query
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:posts'))
+
+    def test_endpoints(self):
+        """
+        Every endpoint answers the objects it is addressed by
+        """
+        slug = ApiTest.group.slug
+        username = ApiTest.author.username
+        cases = {
+            reverse('api:posts'): 20,
+            reverse('api:group_posts', args=(slug,)): 12,
+            reverse('api:profile_posts', args=(username,)): 20,
+            reverse('api:post_comments', args=(ApiTest.post.pk,)): 1,
+            reverse('api:groups'): 1,
+        }
+        for address, number in cases.items():
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(len(response.json()['results']), number)
+        self.assertEqual(
+            self.client.get(reverse('api:group_detail', args=(slug,)))
+            .json()['title'],
+            ApiTest.group.title
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse('api:profile_detail', args=(username,)),
+                {'fields': 'username,posts_count'}
+            ).json(),
+            {'username': username, 'posts_count': 25}
+        )
+
+    def test_errors(self):
+        """
+        Missing objects and writes are answered in JSON
+        """
+        missing = (
+            reverse('api:post_detail', args=(0,)),
+            reverse('api:post_comments', args=(0,)),
+            reverse('api:group_posts', args=('missing',)),
+            reverse('api:profile_detail', args=('missing',)),
+        )
+        for address in missing:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_export_streams_all_rows(self):
+        """
+        Export streams every post as a line of JSON in chunks
+        """
+        with self.settings(API_EXPORT_CHUNK_SIZE=10):
+            response = self.client.get(
+                reverse('api:posts'), {'format': 'ndjson', 'fields': 'id'}
+            )
+            self.assertTrue(response.streaming)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            list(Post.objects.order_by('-pub_date').values_list(
+                'pk', flat=True
+            ))
+        )
+
+    def test_conditional_get(self):
+        """
+        Unchanged lists are answered with 304 Not Modified
+        """
+        address = reverse('api:posts')
+        etag = self.client.get(address)['ETag']
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(text='Новый пост', author=ApiTest.author)
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
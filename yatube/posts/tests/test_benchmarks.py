@@ -0,0 +1,43 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from benchmarks.runner import Runner, compare, percentile
+from benchmarks.scenarios import build_scenarios
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_yatube', users=10, groups=2, posts=30, comments=20,
+            follows=20, likes=30, seed=1, stdout=StringIO()
+        )
+
+    def test_percentile(self):
+        """Percentiles use the nearest rank"""
+        values = list(range(1, 101))
+        for percent, expected in ((50, 50), (95, 95), (99, 99), (100, 100)):
+            with self.subTest(percent=percent):
+                self.assertEqual(percentile(values, percent), expected)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_runner_reports_every_scenario(self):
+        """Every view is measured and succeeds"""
+        scenarios = build_scenarios()
+        results = Runner(iterations=2, warmup=1).run(scenarios)
+        self.assertEqual(
+            set(results), {scenario.name for scenario in scenarios}
+        )
+        for name, result in results.items():
+            with self.subTest(scenario=name):
+                self.assertLess(result['status'], 400)
+                for metric in ('latency_ms', 'queries', 'peak_memory_kib'):
+                    self.assertEqual(
+                        set(result[metric]),
+                        {'p50', 'p95', 'p99', 'mean', 'max'}
+                    )
+        changes = compare(results, results)
+        self.assertEqual(changes['index'][2], 0.0)
@@ -0,0 +1,102 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import bump, get_version_map, get_versions, namespace
+from core.db import PrimaryPin, PrimaryReplicaRouter, current_pin
+from core.templatetags.post_cards import CARD_KEY, post_cards
+from posts.models import Post, User
+
+
+class PrimaryReplicaRouterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_router(self):
+        """Reads go to replicas until the request writes"""
+        router = PrimaryReplicaRouter()
+        token = current_pin.set(PrimaryPin())
+        try:
+            self.assertEqual(router.db_for_read(Post), 'replica_1')
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertEqual(router.db_for_read(Post), 'default')
+        finally:
+            current_pin.reset(token)
+        self.assertEqual(router.db_for_read(Post), 'replica_1')
+        self.assertFalse(router.allow_migrate('replica_1', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+
+    def test_writes_pin_client_to_primary(self):
+        """A client reads from the primary for a while after a write"""
+        self.client.force_login(PrimaryReplicaRouterTest.user)
+        # The whole unsafe request is served by the primary
+        with self.settings(DATABASE_REPLICAS=['replica_1']):
+            response = self.client.post(
+                reverse(
+                    'posts:add_comment',
+                    kwargs={'post_id': PrimaryReplicaRouterTest.post.pk}
+                ),
+                {'text': 'Тестовый комментарий'}
+            )
+        cookie = response.cookies['use_primary']
+        self.assertEqual(cookie['max-age'], 5)
+        self.assertTrue(cookie['httponly'])
+
+    def test_no_pin_without_replicas(self):
+        """Without replicas writes do not set the pin cookie"""
+        self.client.force_login(PrimaryReplicaRouterTest.user)
+        response = self.client.post(
+            reverse(
+                'posts:add_comment',
+                kwargs={'post_id': PrimaryReplicaRouterTest.post.pk}
+            ),
+            {'text': 'Тестовый комментарий'}
+        )
+        self.assertNotIn('use_primary', response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_recent_versions_pin_to_primary(self):
+        """Reads filling entries of a namespace just bumped use primary"""
+        router = PrimaryReplicaRouter()
+        bump('index')
+        for lag, database in ((5, 'default'), (0, 'replica_1')):
+            with self.subTest(lag=lag), self.settings(DB_REPLICA_LAG=lag):
+                token = current_pin.set(PrimaryPin())
+                try:
+                    get_versions('index')
+                    self.assertEqual(router.db_for_read(Post), database)
+                finally:
+                    current_pin.reset(token)
+
+    def test_lagging_replica_after_bump(self):
+        """A page rendered right after a change reads no replica"""
+        cache.clear()
+        post = Post.objects.create(
+            author=PrimaryReplicaRouterTest.user, text='Новый пост'
+        )
+        # The replica alias is not configured, reading it would fail
+        with self.settings(DATABASE_REPLICAS=['replica_1']):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, post.text)
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_cards_read_from_replica_not_stored(self):
+        """Cards of posts read from a replica are not stored as current"""
+        post = PrimaryReplicaRouterTest.post
+        name = namespace('post', post.pk)
+        bump(name)
+        pin = PrimaryPin()
+        pin.replica_used = True
+        token = current_pin.set(pin)
+        try:
+            post_cards([post])
+            version = get_version_map([name])[name]
+        finally:
+            current_pin.reset(token)
+        self.assertIsNone(
+            cache.get(CARD_KEY.format(post.pk, version, 'eager'))
+        )
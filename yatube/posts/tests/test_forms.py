@@ -1,12 +1,20 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO, StringIO
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import F
+from django.db.models.signals import pre_save
 from django.test import TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.models import Comment, Group, Post, User
+from posts.thumbnails import variants
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -118,7 +126,7 @@ class PostsFormsTests(TestCase):
             reverse('posts:post_create'),
             data=create_form_data,
             follow=True,
-            image='posts/image_test.gif'
+            image='posts/image_test.jpg'
         )
         new_post = Post.objects.latest('pub_date')
         self.assertTrue(
@@ -126,7 +134,7 @@ class PostsFormsTests(TestCase):
                 text=text,
                 group=PostsFormsTests.group.pk,
                 pk=new_post.pk,
-                image='posts/image_test.gif',
+                image='posts/image_test.jpg',
             ).exists()
         )
         self.assertRedirects(response, redirect_url)
@@ -173,7 +181,7 @@ class PostsFormsTests(TestCase):
                 pk=PostsFormsTests.post.pk,
                 group=PostsFormsTests.new_group.pk,
                 author=PostsFormsTests.author,
-                image='posts/image_test_new.gif'
+                image='posts/image_test_new.jpg'
             ).exists()
         )
         self.assertRedirects(
@@ -185,6 +193,83 @@ class PostsFormsTests(TestCase):
         )
         self.assertEqual(number_posts_before_edit, Post.objects.count())
 
+    def test_edit_keeps_concurrent_counters(self):
+        """
+        Editing a post does not overwrite counters changed meanwhile
+        """
+        post = PostsFormsTests.post
+
+        def like_meanwhile(sender, instance, **kwargs):
+            Post.objects.filter(pk=instance.pk).update(
+                likes=F('likes') + 1, comments_count=F('comments_count') + 1
+            )
+
+        before = Post.objects.values('likes', 'comments_count').get(
+            pk=post.pk
+        )
+        self.client.force_login(PostsFormsTests.author)
+        pre_save.connect(like_meanwhile, sender=Post)
+        try:
+            self.client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+                data={'text': 'Отредактированный текст'}
+            )
+        finally:
+            pre_save.disconnect(like_meanwhile, sender=Post)
+        edited = Post.objects.get(pk=post.pk)
+        self.assertEqual(edited.text, 'Отредактированный текст')
+        self.assertEqual(edited.likes, before['likes'] + 1)
+        self.assertEqual(
+            edited.comments_count, before['comments_count'] + 1
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIZE=100)
+    def test_uploaded_image_ingested(self):
+        """
+        Uploaded images are downscaled, stripped and measured
+        """
+        self.client.force_login(PostsFormsTests.user)
+        photo = BytesIO()
+        exif = Image.Exif()
+        # Camera model
+        exif[0x0110] = 'Тестовая камера'
+        Image.new('RGB', (400, 200), 'red').save(photo, 'PNG', exif=exif)
+        uploaded = SimpleUploadedFile(
+            name='photo.png',
+            content=photo.getvalue(),
+            content_type='image/png'
+        )
+        self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с фотографией', 'image': uploaded}
+        )
+        post = Post.objects.get(text='Пост с фотографией')
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        self.assertEqual(post.image_bytes, post.image.size)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (100, 50))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_broken_image_rejected(self):
+        """
+        Files which are not images are not saved
+        """
+        self.client.force_login(PostsFormsTests.user)
+        uploaded = SimpleUploadedFile(
+            name='broken.jpg', content=b'not an image',
+            content_type='image/jpeg'
+        )
+        response = self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост со сломанной картинкой', 'image': uploaded}
+        )
+        self.assertFalse(
+            Post.objects.filter(text='Пост со сломанной картинкой').exists()
+        )
+        self.assertEqual(response.status_code, 200)
+
     def test_guest_client_not_create_comment(self):
         """
         Guest user can't create comment
@@ -227,3 +312,24 @@ class PostsFormsTests(TestCase):
             Comment.objects.count(),
             number_comments + 1
         )
+        PostsFormsTests.post.refresh_from_db()
+        self.assertEqual(
+            PostsFormsTests.post.comments_count, number_comments + 1
+        )
+        Comment.objects.latest('pub_date').delete()
+        PostsFormsTests.post.refresh_from_db()
+        self.assertEqual(PostsFormsTests.post.comments_count, number_comments)
+
+    def test_generate_thumbnails_command(self):
+        """
+        Thumbnails of post images are generated ahead of requests
+        """
+        cache.clear()
+        thumbnails_root = os.path.join(TEMP_MEDIA_ROOT, 'cache')
+        shutil.rmtree(thumbnails_root, ignore_errors=True)
+        call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        thumbnails = [
+            name for path, dirs, files in os.walk(thumbnails_root)
+            for name in files
+        ]
+        self.assertEqual(len(thumbnails), len(list(variants())))
@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.likes import flush_likes, pending_likes, toggle_like
+from posts.models import Like, Post, User
+
+
+class PostsLikesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Тестовое имя')
+        cls.author = User.objects.create_user(username='Тестовый автор')
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author
+        )
+
+    def test_like_and_unlike(self):
+        """
+        Like view toggles the like and counter of the post
+        """
+        self.client.force_login(PostsLikesTests.user)
+        address = reverse(
+            'posts:post_like_or_unlike',
+            kwargs={'post_id': PostsLikesTests.post.pk}
+        )
+        response = self.client.get(address, HTTP_REFERER='/')
+        self.assertRedirects(response, '/')
+        self.assertEqual(Post.objects.get(pk=self.post.pk).likes, 1)
+        self.assertTrue(
+            Like.objects.filter(
+                user=PostsLikesTests.user, post=PostsLikesTests.post
+            ).exists()
+        )
+        self.client.get(address)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).likes, 0)
+        self.assertFalse(Like.objects.exists())
+
+
+class PostsLikesConcurrencyTests(TransactionTestCase):
+    USERS = 20
+
+    def setUp(self):
+        author = User.objects.create_user(username='Тестовый автор')
+        self.post = Post.objects.create(text='Тестовый текст', author=author)
+        self.users = [
+            User.objects.create_user(username=f'Пользователь {number}')
+            for number in range(self.USERS)
+        ]
+
+    def like(self, user):
+        # SQLite test database locks a table for concurrent writers,
+        # a failed toggle is rolled back as a whole and retried
+        try:
+            while True:
+                try:
+                    return toggle_like(user, self.post.pk)
+                except OperationalError:
+                    time.sleep(0.001)
+        finally:
+            connection.close()
+
+    def test_concurrent_likes_counter_is_exact(self):
+        """
+        Many users liking one post at once keep the counter exact
+        """
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(self.like, self.users))
+            list(executor.map(self.like, self.users[::2]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes, self.USERS // 2)
+        self.assertEqual(Like.objects.count(), self.USERS // 2)
+
+    @override_settings(LIKES_BUFFER_SHARDS=4)
+    def test_buffered_likes_flush(self):
+        """
+        Buffered likes are written to the post by flush
+        """
+        cache.clear()
+        toggle_like(self.users[0], self.post.pk)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).likes, 0)
+        self.assertEqual(pending_likes(self.post.pk), 1)
+        self.assertEqual(flush_likes(), {self.post.pk})
+        self.assertEqual(Post.objects.get(pk=self.post.pk).likes, 1)
+        self.assertEqual(pending_likes(self.post.pk), 0)
+        self.assertEqual(flush_likes(), set())
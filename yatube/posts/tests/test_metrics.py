@@ -0,0 +1,122 @@
+import re
+import time
+
+from django.core.cache import cache, caches
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import (
+    RequestMetrics, current, instrument_cache, registry
+)
+from posts.models import Post, User
+
+
+@override_settings(
+    SERVER_TIMING=True, METRICS_ALLOWED_IPS=('127.0.0.1',)
+)
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        registry.clear()
+        # Pages cached for guests are served without queries
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Responses report timings of the request"""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('total', 'db', 'tpl', 'cache'):
+            with self.subTest(metric=metric):
+                self.assertRegex(timing, rf'(^|, ){metric};')
+        queries = int(re.search(r'"(\d+) queries"', timing).group(1))
+        self.assertGreater(queries, 0)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """Server-Timing header can be turned off"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_metrics_endpoint(self):
+        """Requests are aggregated per view name in Prometheus format"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(
+            reverse('posts:post_detail', args=(MetricsTest.post.pk,))
+        )
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; version=0.0.4'
+        )
+        content = response.content.decode()
+        expected = (
+            '# TYPE yatube_request_duration_seconds histogram',
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2',
+            'yatube_db_queries_count{view="posts:post_detail"} 1',
+            '# TYPE yatube_cache_misses_total counter',
+        )
+        for line in expected:
+            with self.subTest(line=line):
+                self.assertIn(line, content)
+        self.assertRegex(
+            content, r'yatube_cache_hits_total\{view="posts:index"\} [1-9]'
+        )
+
+    def test_cache_lookups_counted_once(self):
+        """Keys read by get_many are counted once each"""
+        instrument_cache(caches['default'])
+        cache.set('metrics_test', 1)
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            cache.get_many(['metrics_test', 'missing_1', 'missing_2'])
+        finally:
+            current.reset(token)
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (1, 2))
+
+    def test_nested_renders_timed_once(self):
+        """Templates rendered while rendering another are timed once"""
+        engine = engines['django']
+        inner = engine.from_string('{{ text }}')
+
+        def render_inner():
+            time.sleep(0.05)
+            return inner.render({'text': 'Тестовый пост'})
+
+        outer = engine.from_string('{{ render_inner }}')
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            started = time.perf_counter()
+            outer.render({'render_inner': render_inner})
+            elapsed = time.perf_counter() - started
+        finally:
+            current.reset(token)
+        self.assertGreater(metrics.template_time, 0.05)
+        self.assertLessEqual(metrics.template_time, elapsed)
+
+    @override_settings(METRICS_ALLOWED_IPS=(), METRICS_TOKEN='secret')
+    def test_metrics_forbidden(self):
+        """Only allowed addresses, token holders and staff read metrics"""
+        for authorization in ('', 'Bearer wrong', 'Basic secret'):
+            with self.subTest(authorization=authorization):
+                response = self.client.get(
+                    reverse('metrics'), HTTP_AUTHORIZATION=authorization
+                )
+                self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
@@ -1,6 +1,15 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count, F
 from django.test import TestCase
 
-from posts.models import Group, Post, User
+from posts.likes import toggle_like
+from posts.models import (
+    AuthorStats, Comment, FeedEntry, Follow, Group, Like, Post, User
+)
+from posts.stats import get_stats
 
 
 class PostsModelTest(TestCase):
@@ -57,3 +66,83 @@ class PostsModelTest(TestCase):
                     PostsModelTest.post._meta.get_field(field).verbose_name,
                     expected_value
                 )
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+
+    def setUp(self):
+        # Statistics cached by earlier tests outlive their rows
+        cache.clear()
+
+    def assertStats(self, author, **expected):
+        stats = AuthorStats.objects.get(author=author)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_stats_follow_posts_and_likes(self):
+        """Author statistics follow posts, subscriptions and likes"""
+        get_stats(AuthorStatsTest.author)
+        get_stats(AuthorStatsTest.follower)
+        post = Post.objects.create(
+            author=AuthorStatsTest.author, text='Тестовый пост'
+        )
+        follow = Follow.objects.create(
+            user=AuthorStatsTest.follower, author=AuthorStatsTest.author
+        )
+        toggle_like(AuthorStatsTest.follower, post.pk)
+        self.assertStats(
+            AuthorStatsTest.author,
+            posts_count=1, followers_count=1, likes_count=1
+        )
+        self.assertStats(AuthorStatsTest.follower, following_count=1)
+        follow.delete()
+        post.delete()
+        self.assertStats(
+            AuthorStatsTest.author,
+            posts_count=0, followers_count=0, likes_count=0
+        )
+        self.assertStats(AuthorStatsTest.follower, following_count=0)
+
+    def test_reconcile_author_stats(self):
+        """Reconciliation recounts statistics from scratch"""
+        get_stats(AuthorStatsTest.author)
+        Post.objects.bulk_create([
+            Post(author=AuthorStatsTest.author, text='Тестовый пост')
+            for i in range(3)
+        ])
+        self.assertStats(AuthorStatsTest.author, posts_count=0)
+        call_command('reconcile_author_stats', stdout=StringIO())
+        self.assertStats(AuthorStatsTest.author, posts_count=3)
+
+
+class SeedYatubeTest(TestCase):
+    def test_seed_yatube(self):
+        """Generated data is consistent with the derived tables"""
+        call_command(
+            'seed_yatube', users=20, groups=3, posts=200, comments=100,
+            follows=50, likes=300, batch_size=64, seed=1, stdout=StringIO()
+        )
+        counts = {
+            User: 20, Group: 3, Post: 200, Comment: 100, Follow: 50,
+            Like: 300, AuthorStats: 20,
+        }
+        for model, expected in counts.items():
+            with self.subTest(model=model.__name__):
+                self.assertEqual(model.objects.count(), expected)
+        self.assertFalse(
+            Post.objects.annotate(liked=Count('post', distinct=True))
+            .exclude(likes=F('liked')).exists()
+        )
+        self.assertFalse(
+            Post.objects.annotate(
+                commented=Count('comments', distinct=True)
+            ).exclude(comments_count=F('commented')).exists()
+        )
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertTrue(FeedEntry.objects.exists())
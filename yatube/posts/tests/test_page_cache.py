@@ -0,0 +1,144 @@
+from django.contrib import messages
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from core.page_cache import anonymous_page
+from posts.models import Comment, Group, Post, User
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Тестовый автор')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='test-slug'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        cls.addresses = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.author.username,)),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_served_from_cache(self):
+        """
+        Repeated guest requests run at most the query of the namespaces
+        """
+        for address in AnonymousPageCacheTest.addresses:
+            with self.subTest(address=address):
+                content = self.client.get(address).content
+                # Pages of an object look up its id by the address
+                queries = 0 if address == reverse('posts:index') else 1
+                with self.assertNumQueries(queries):
+                    response = self.client.get(address)
+                self.assertEqual(response.content, content)
+
+    def test_query_string_cached_separately(self):
+        """
+        Pages with other query strings are rendered on their own
+        """
+        address = reverse('posts:index')
+        self.client.get(address)
+        with self.assertNumQueries(1):
+            self.client.get(address, {'cursor': 'last'})
+
+    def test_unread_parameters_share_page(self):
+        """
+        Query parameters the view does not read do not add entries
+        """
+        address = reverse('posts:index')
+        content = self.client.get(address, {'cursor': 'last'}).content
+        for params in (
+            {'utm_source': 'test', 'cursor': 'last'},
+            {'cursor': 'last', 'a': '1'},
+        ):
+            with self.subTest(params=params):
+                with self.assertNumQueries(0):
+                    response = self.client.get(address, params)
+                self.assertEqual(response.content, content)
+
+    def test_visitor_cookies_not_cached(self):
+        """
+        Pages getting cookies from the outer middleware are not stored
+        """
+        def use_csrf(request):
+            get_token(request)
+
+        def add_message(request):
+            request.session = SessionStore()
+            request._messages = FallbackStorage(request)
+            messages.info(request, 'Тестовое сообщение')
+
+        def change_session(request):
+            request.session = SessionStore()
+            request.session['visited'] = True
+
+        for set_state in (use_csrf, add_message, change_session):
+            rendered = []
+
+            @anonymous_page(lambda request: ['index'])
+            def view(request):
+                rendered.append(request)
+                set_state(request)
+                return HttpResponse('Тестовая страница')
+
+            with self.subTest(state=set_state.__name__):
+                for _ in range(2):
+                    view(RequestFactory().get('/'))
+                self.assertEqual(len(rendered), 2)
+
+    def test_invalidated_on_changes(self):
+        """
+        Cached pages show new posts and comments
+        """
+        for address in AnonymousPageCacheTest.addresses:
+            self.client.get(address)
+        post = Post.objects.create(
+            text='Новый пост', author=AnonymousPageCacheTest.author,
+            group=AnonymousPageCacheTest.group
+        )
+        for address in AnonymousPageCacheTest.addresses[:3]:
+            with self.subTest(address=address):
+                self.assertContains(self.client.get(address), post.text)
+        Comment.objects.create(
+            text='Новый комментарий', author=AnonymousPageCacheTest.author,
+            post=AnonymousPageCacheTest.post
+        )
+        self.assertContains(
+            self.client.get(AnonymousPageCacheTest.addresses[3]),
+            'Новый комментарий'
+        )
+
+    def test_session_bypasses_cache(self):
+        """
+        Logged in users always get the page rendered
+        """
+        address = reverse('posts:index')
+        self.client.get(address)
+        self.client.force_login(AnonymousPageCacheTest.author)
+        response = self.client.get(address)
+        self.assertContains(response, 'Выйти')
+        self.assertIsNotNone(response.context)
+
+    def test_disabled(self):
+        """
+        Zero timeout turns the cache off
+        """
+        address = reverse('posts:index')
+        with self.settings(ANONYMOUS_PAGE_TIMEOUT=0):
+            self.client.get(address)
+            self.assertIsNotNone(self.client.get(address).context)
@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Follow, Group, Post, User
+from posts.thumbnails import SCHEDULED_KEY, generate_thumbnails
+
+CARD_TEMPLATE = 'includes/post_card.html'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Тестовый автор')
+        cls.follower = User.objects.create_user(username='Подписчик')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='test-slug'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(PostCardsTest.follower)
+
+    def rendered_cards(self, address):
+        response = self.client.get(address)
+        return [
+            template for template in response.templates
+            if template.name == CARD_TEMPLATE
+        ]
+
+    def test_card_shared_by_feeds(self):
+        """
+        A card rendered for one feed is reused by the others
+        """
+        self.assertEqual(len(self.rendered_cards(reverse('posts:index'))), 1)
+        addresses = (
+            reverse('posts:group_posts', args=(PostCardsTest.group.slug,)),
+            reverse('posts:profile', args=(PostCardsTest.author.username,)),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=Тестовый',
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                self.assertEqual(self.rendered_cards(address), [])
+
+    def test_card_refreshed_on_changes(self):
+        """
+        Edits and likes render the card again in every feed
+        """
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:follow_index'),
+        )
+        for address in addresses:
+            self.client.get(address)
+        PostCardsTest.post.text = 'Отредактированный пост'
+        PostCardsTest.post.save()
+        self.client.get(
+            reverse('posts:post_like_or_unlike', args=(PostCardsTest.post.pk,))
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertContains(response, 'Отредактированный пост')
+                self.assertContains(
+                    response, '<p style="display: inline;" '
+                    'class="text-primary">1</p>', html=True
+                )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Тестовый автор')
+        photo = BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(photo, 'JPEG')
+        for number in range(2):
+            post = Post.objects.create(
+                text=f'Пост с фотографией {number}',
+                author=cls.author,
+                image=SimpleUploadedFile(
+                    name='photo.jpg',
+                    content=photo.getvalue(),
+                    content_type='image/jpeg'
+                )
+            )
+            generate_thumbnails(post.image)
+        fresh_photo = BytesIO()
+        Image.new('RGB', (1200, 800), 'blue').save(fresh_photo, 'JPEG')
+        cls.fresh_post = Post.objects.create(
+            text='Пост с новой фотографией',
+            author=cls.author,
+            image=SimpleUploadedFile(
+                name='fresh.jpg',
+                content=fresh_photo.getvalue(),
+                content_type='image/jpeg'
+            ),
+            image_width=1200,
+            image_height=800
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_responsive_images(self):
+        """
+        Post images list every variant and lazy load below the first post
+        """
+        response = self.client.get(reverse('posts:index'))
+        content = response.content.decode()
+        for width in settings.POST_IMAGE_WIDTHS:
+            with self.subTest(width=width):
+                self.assertIn(f' {width}w', content)
+        self.assertIn(f'sizes="{settings.POST_IMAGE_SIZES}"', content)
+        self.assertEqual(content.count('<img class="card-img'), 3)
+        self.assertEqual(content.count('loading="lazy"'), 2)
+        self.assertEqual(content.count('width="960" height="339"'), 2)
+
+    def test_missing_variants_not_rendered(self):
+        """
+        A page shows the original image while its variants are missing
+        and schedules them instead of rendering
+        """
+        image = PostImageTest.fresh_post.image
+        thumbnails = os.path.join(settings.MEDIA_ROOT, 'cache')
+        rendered = set(
+            os.path.join(path, name)
+            for path, _, names in os.walk(thumbnails) for name in names
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=(PostImageTest.fresh_post.pk,))
+        )
+        self.assertContains(response, f'src="{image.url}"')
+        self.assertNotContains(response, 'srcset=')
+        self.assertContains(response, 'width="1200" height="800"')
+        self.assertTrue(cache.get(SCHEDULED_KEY.format(image.name)))
+        self.assertEqual(rendered, set(
+            os.path.join(path, name)
+            for path, _, names in os.walk(thumbnails) for name in names
+        ))
+
+    def test_post_detail_image_eager(self):
+        """
+        The image of a post page is loaded right away
+        """
+        post = Post.objects.exclude(pk=PostImageTest.fresh_post.pk).latest(
+            'pub_date'
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, 'srcset=')
+        self.assertNotContains(response, 'loading="lazy"')
@@ -0,0 +1,82 @@
+import re
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+# Plan steps reading a whole table or sorting rows outside an index
+SLOW_STEP = re.compile(
+    r'^SCAN (?!.*USING (COVERING )?INDEX)|USE TEMP B-TREE'
+)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN of SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_yatube', users=20, groups=2, posts=300, comments=100,
+            follows=60, likes=100, seed=1, stdout=StringIO()
+        )
+        cls.follower = User.objects.get(pk=(
+            Follow.objects.values('user').annotate(number=Count('pk'))
+            .order_by('-number').values_list('user', flat=True)[0]
+        ))
+        group = Group.objects.annotate(number=Count('group')).latest('number')
+        author = User.objects.annotate(number=Count('posts')).latest('number')
+        post = Post.objects.latest('comments_count')
+        cls.addresses = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=(group.slug,)),
+            reverse('posts:profile', args=(author.username,)),
+            reverse('posts:profile_posts', args=(author.username,)),
+            reverse('posts:post_detail', args=(post.pk,)),
+            reverse('posts:follow_index'),
+        )
+
+    def slow_steps(self, queries):
+        steps = []
+        for query in queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                steps.extend(
+                    (query['sql'], row[-1]) for row in cursor.fetchall()
+                    if SLOW_STEP.search(row[-1])
+                )
+        return steps
+
+    def test_views_use_indexes(self):
+        """
+        Queries of the views neither scan whole tables nor sort rows
+        """
+        self.client.force_login(QueryPlanTest.follower)
+        for address in QueryPlanTest.addresses:
+            cache.clear()
+            page = self.client.get(address).context['page_obj']
+            self.assertTrue(page.has_next())
+            next_page = self.client.get(
+                address, {'cursor': page.next_cursor}
+            ).context['page_obj']
+            pages = {
+                'first': {},
+                'next': {'cursor': page.next_cursor},
+                'previous': {'cursor': next_page.previous_cursor},
+                'last': {'cursor': page.paginator.last_cursor},
+            }
+            for name, params in pages.items():
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(address, params)
+                with self.subTest(address=address, page=name):
+                    self.assertEqual(self.slow_steps(queries), [])
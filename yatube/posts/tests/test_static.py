@@ -0,0 +1,138 @@
+import gzip
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.static import brotli
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+STYLESHEET = 'css/bootstrap.min.css'
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class StaticFilesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.hashed_name = staticfiles_storage.stored_name(STYLESHEET)
+        cls.url = settings.STATIC_URL + cls.hashed_name
+        with open(os.path.join(settings.BASE_DIR, 'static', STYLESHEET),
+                  'rb') as file:
+            cls.content = file.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_link_hashed_names(self):
+        """
+        Pages link static files by names with the hash of the content
+        """
+        self.assertNotEqual(StaticFilesTest.hashed_name, STYLESHEET)
+        self.assertContains(
+            self.client.get(reverse('posts:index')), StaticFilesTest.url
+        )
+
+    def test_precompressed_siblings(self):
+        """
+        Text files are precompressed, compressed images are not
+        """
+        path = os.path.join(TEMP_STATIC_ROOT, StaticFilesTest.hashed_name)
+        with open(path + '.gz', 'rb') as file:
+            self.assertEqual(
+                gzip.decompress(file.read()), StaticFilesTest.content
+            )
+        self.assertEqual(os.path.exists(path + '.br'), brotli is not None)
+        self.assertFalse(os.path.exists(os.path.join(
+            TEMP_STATIC_ROOT, staticfiles_storage.stored_name('img/logo.png')
+        ) + '.gz'))
+
+    def test_served_compressed(self):
+        """
+        The compressed sibling is served to clients accepting it
+        """
+        response = self.client.get(
+            StaticFilesTest.url, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)),
+            StaticFilesTest.content
+        )
+
+    def test_wildcard_accepts_compressed(self):
+        """
+        Any coding accepted with * gets a compressed sibling
+        """
+        response = self.client.get(
+            StaticFilesTest.url, HTTP_ACCEPT_ENCODING='*'
+        )
+        self.assertIn(response['Content-Encoding'], ('br', 'gzip'))
+
+    def test_served_uncompressed(self):
+        """
+        Clients not accepting or refusing the coding get the file itself
+        """
+        for accept_encoding in (
+            '', 'identity', 'gzip;q=0, br;q=0', '*;q=0', '*, gzip;q=0, br;q=0'
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.client.get(
+                    StaticFilesTest.url,
+                    HTTP_ACCEPT_ENCODING=accept_encoding
+                )
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(
+                    b''.join(response.streaming_content),
+                    StaticFilesTest.content
+                )
+
+    def test_unhashed_names_revalidated(self):
+        """
+        Names without a hash are cached for a short time only
+        """
+        response = self.client.get(settings.STATIC_URL + STYLESHEET)
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.STATIC_UNHASHED_MAX_AGE}'
+        )
+
+    def test_not_modified(self):
+        """
+        Conditional requests for unchanged files get no body
+        """
+        response = self.client.get(StaticFilesTest.url)
+        response = self.client.get(
+            StaticFilesTest.url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_missing_files_not_served(self):
+        """
+        Unknown names, names outside of STATIC_ROOT and compressed
+        siblings are not found
+        """
+        for path in (
+            'css/missing.css', '../manage.py',
+            StaticFilesTest.hashed_name + '.gz',
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(settings.STATIC_URL + path)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,182 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+
+from core.thumbnails import (
+    PRUNE_TARGET, RENDER_LOCK_KEY, account, prune, pruner, render_lock
+)
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+# A day ago, older than THUMBNAIL_STORE_MIN_AGE in the tests
+LONG_AGO = time.time() - 60 * 60 * 24 * 2
+
+
+def photo(color):
+    content = BytesIO()
+    Image.new('RGB', (300, 200), color).save(content, 'JPEG')
+    return content.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_STORE_MIN_AGE=60)
+class ThumbnailStoreTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='Тестовый автор')
+        cls.posts = [
+            Post.objects.create(
+                text='Тестовый пост', author=author,
+                image=SimpleUploadedFile(
+                    name=name, content=photo(color),
+                    content_type='image/jpeg'
+                )
+            )
+            for name, color in (
+                ('red.jpg', 'red'), ('copy.jpg', 'red'), ('blue.jpg', 'blue')
+            )
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear()
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'), ignore_errors=True
+        )
+
+    def thumbnail(self, post, geometry='100x100'):
+        return get_thumbnail(post.image, geometry, crop='center')
+
+    def test_thumbnails_addressed_by_content(self):
+        """
+        Identical images share thumbnails, different ones do not
+        """
+        red, copy, blue = ThumbnailStoreTest.posts
+        self.assertEqual(self.thumbnail(red).name, self.thumbnail(copy).name)
+        self.assertNotEqual(
+            self.thumbnail(red).name, self.thumbnail(blue).name
+        )
+
+    def test_reused_name_not_served_old_thumbnail(self):
+        """
+        A new file saved under the name of a deleted one gets its own
+        thumbnail
+        """
+        content = BytesIO()
+        Image.new('RGB', (200, 300), 'green').save(content, 'JPEG')
+        name = default.storage.save(
+            'posts/reused.jpg', SimpleUploadedFile('reused.jpg', photo('red'))
+        )
+        post = Post(image=name)
+        old = self.thumbnail(post).name
+        default.storage.delete(name)
+        self.assertEqual(
+            default.storage.save(
+                name, SimpleUploadedFile('reused.jpg', content.getvalue())
+            ),
+            name
+        )
+        self.assertNotEqual(self.thumbnail(post).name, old)
+
+    def test_flushed_store_not_rendered_again(self):
+        """
+        Thumbnails on disk are reused after the key-value store is flushed
+        """
+        post = ThumbnailStoreTest.posts[0]
+        path = default.storage.path(self.thumbnail(post).name)
+        os.utime(path, (LONG_AGO, LONG_AGO))
+        cache.clear()
+        default.kvstore.clear()
+        thumbnail = self.thumbnail(post)
+        self.assertEqual(default.storage.path(thumbnail.name), path)
+        self.assertEqual(os.stat(path).st_mtime, LONG_AGO)
+        self.assertEqual(thumbnail.width, 100)
+
+    def test_prune_evicts_least_recently_used(self):
+        """
+        Pruning deletes the oldest thumbnails and keeps recent ones
+        """
+        red, copy, blue = ThumbnailStoreTest.posts
+        old = default.storage.path(self.thumbnail(red, '50x50').name)
+        older = default.storage.path(self.thumbnail(red, '60x60').name)
+        recent = default.storage.path(self.thumbnail(blue).name)
+        os.utime(old, (LONG_AGO, LONG_AGO))
+        os.utime(older, (LONG_AGO - 1, LONG_AGO - 1))
+        sizes = {path: os.path.getsize(path) for path in (old, older, recent)}
+        deleted, total = prune(
+            (sizes[old] + sizes[recent]) / PRUNE_TARGET
+        )
+        self.assertEqual(deleted, 1)
+        self.assertFalse(os.path.exists(older))
+        self.assertTrue(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+        # Recently used thumbnails are kept over the cap
+        deleted, total = prune(0)
+        self.assertEqual(deleted, 1)
+        self.assertTrue(os.path.exists(recent))
+        self.assertEqual(total, sizes[recent])
+        # Evicted thumbnails are rendered again when asked for
+        self.assertTrue(os.path.exists(
+            default.storage.path(self.thumbnail(red, '60x60').name)
+        ))
+
+    def test_recent_store_over_cap_not_rescanned(self):
+        """
+        A store over the cap with nothing evictable is scanned again only
+        after it grows, in the background
+        """
+        red, copy, blue = ThumbnailStoreTest.posts
+        first = self.thumbnail(red)
+        second = self.thumbnail(blue)
+        # Scans of the rendered thumbnails are done
+        pruner.submit(lambda: None).result()
+        growth = sum(
+            os.path.getsize(default.storage.path(thumbnail.name))
+            for thumbnail in (first, second)
+        )
+        with override_settings(
+            THUMBNAIL_STORE_MAX_BYTES=1, THUMBNAIL_STORE_RESCAN_BYTES=growth
+        ):
+            scan = account(first)
+            self.assertIsNotNone(scan)
+            deleted, total = scan.result()
+            self.assertEqual(deleted, 0)
+            self.assertIsNone(account(first))
+            scan = account(second)
+            self.assertIsNotNone(scan)
+            self.assertEqual(scan.result(), (0, total))
+        self.assertTrue(os.path.exists(default.storage.path(first.name)))
+
+    def test_render_lock_serializes_workers(self):
+        """
+        A worker waits for the one rendering the same thumbnail
+        """
+        events = []
+
+        def worker():
+            with render_lock('thumbnail'):
+                events.append('waiting worker')
+
+        with render_lock('thumbnail'):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            time.sleep(0.2)
+            events.append('lock holder')
+        thread.join()
+        self.assertEqual(events, ['lock holder', 'waiting worker'])
+        self.assertIsNone(cache.get(RENDER_LOCK_KEY.format('thumbnail')))
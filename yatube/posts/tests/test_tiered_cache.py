@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.tiered import TieredCache
+
+
+@override_settings(LOCAL_CACHE_TIMEOUT=60, LOCAL_CACHE_SIZE=2)
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tiered = TieredCache(lock_timeout=2)
+
+    def test_local_tier(self):
+        """Values are served locally and evicted least recently used"""
+        self.assertEqual(self.tiered.get_or_set('a', 1, 60), 1)
+        cache.clear()
+        self.assertEqual(self.tiered.get_or_set('a', 2, 60), 1)
+        self.tiered.get_or_set('b', 1, 60)
+        self.tiered.get_or_set('c', 1, 60)
+        self.assertEqual(self.tiered.get_or_set('a', 3, 60), 3)
+
+    def test_delete(self):
+        """Deleted keys are recomputed"""
+        self.tiered.get_or_set('a', 1, 60)
+        self.tiered.delete('a')
+        self.assertEqual(self.tiered.get_or_set('a', 2, 60), 2)
+
+    def test_missing_value_computed_once(self):
+        """Concurrent requests of a missing value wait for one computation"""
+        calls = []
+        lock = Lock()
+
+        def compute():
+            with lock:
+                calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        with ThreadPoolExecutor(4) as executor:
+            values = list(executor.map(
+                lambda _: self.tiered.get_or_set('slow', compute, 60),
+                range(4)
+            ))
+        self.assertEqual(values, ['value'] * 4)
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(LOCAL_CACHE_TIMEOUT=0)
+    def test_early_expiration(self):
+        """Values close to expiry are refreshed early"""
+        cache.set('a', ('old', 3600, time.time() + 1), 60)
+        self.assertEqual(self.tiered.get_or_set('a', 'new', 60), 'new')
+        cache.set('a', ('old', 0.001, time.time() + 3600), 60)
+        self.assertEqual(self.tiered.get_or_set('a', 'new', 60), 'old')
@@ -1,12 +1,18 @@
+from io import StringIO
 from urllib.parse import urlencode
 
 from django import forms
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Comment, Follow, Group, Post, User
+from core.tiered import tiered_cache
+from posts.feed import HEAVY_AUTHORS_KEY
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
 
 
 class PostsViewsTests(TestCase):
@@ -76,6 +82,10 @@ class PostsViewsTests(TestCase):
             ) for i in range(13)
         ]
         Post.objects.bulk_create(posts)
+        # bulk_create does not send signals maintaining author statistics
+        call_command('reconcile_author_stats', stdout=StringIO())
+        # Nor does it invalidate pages cached for guests
+        cache.clear()
         # Number posts
         self.number_posts = Post.objects.count()
         # Latest posts
@@ -109,6 +119,203 @@ class PostsViewsTests(TestCase):
             new_post_index.pk
         )
 
+    def test_index_cache_vary_on_page(self):
+        """
+        Cached index fragment differs between pages
+        """
+        address = reverse('posts:index')
+        response = self.client.get(address)
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(address, {'cursor': next_cursor})
+        oldest = Post.objects.order_by('pub_date', 'pk').first()
+        self.assertContains(
+            response,
+            reverse('posts:post_detail', kwargs={'post_id': oldest.pk})
+        )
+
+    def test_profile_cache_vary_on_author(self):
+        """
+        Cached profile fragment is not shared between authors
+        """
+        Post.objects.create(
+            text='Пост другого пользователя',
+            author=PostsViewsTests.user
+        )
+        self.client.get(
+            reverse(
+                'posts:profile',
+                kwargs={'username': PostsViewsTests.author.username}
+            )
+        )
+        response = self.client.get(
+            reverse(
+                'posts:profile',
+                kwargs={'username': PostsViewsTests.user.username}
+            )
+        )
+        self.assertContains(response, 'Пост другого пользователя')
+
+    def test_follow_cache_vary_on_user(self):
+        """
+        Cached follow feed fragment is not shared between users
+        """
+        Post.objects.create(
+            text='Пост для подписчиков',
+            author=PostsViewsTests.author
+        )
+        self.client.force_login(PostsViewsTests.follower)
+        self.client.get(reverse('posts:follow_index'))
+        self.client.force_login(PostsViewsTests.user)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertNotContains(response, 'Пост для подписчиков')
+
+    def test_index_cache_invalidated_on_post_change(self):
+        """
+        New, edited and deleted posts invalidate cached index
+        """
+        address = reverse('posts:index')
+        self.client.get(address)
+        new_post = Post.objects.create(
+            text='Новый пост после кеширования',
+            author=PostsViewsTests.author
+        )
+        self.assertContains(
+            self.client.get(address), 'Новый пост после кеширования'
+        )
+        new_post.text = 'Отредактированный пост'
+        new_post.save()
+        self.assertContains(
+            self.client.get(address), 'Отредактированный пост'
+        )
+        new_post.delete()
+        self.assertNotContains(
+            self.client.get(address), 'Отредактированный пост'
+        )
+
+    def test_comments_cached_until_comment_added(self):
+        """
+        Cached comments are rendered without querying comments
+        and refreshed when a comment is added
+        """
+        cache.clear()
+        address = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': PostsViewsTests.post.pk}
+        )
+        self.client.get(address)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(address)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'FROM "posts_comment"' in query['sql']
+        ])
+        self.client.force_login(PostsViewsTests.user)
+        self.client.post(
+            reverse(
+                'posts:add_comment',
+                kwargs={'post_id': PostsViewsTests.post.pk}
+            ),
+            {'text': 'Новый комментарий после кеширования'}
+        )
+        response = self.client.get(address)
+        self.assertContains(response, 'Новый комментарий после кеширования')
+        self.assertContains(response, 'Комментарии: 2')
+
+    def test_conditional_get(self):
+        """
+        Unchanged pages answer 304 until their content changes
+        """
+        addresses = (
+            reverse('posts:index'),
+            reverse(
+                'posts:group_posts',
+                kwargs={'slug': PostsViewsTests.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': PostsViewsTests.author.username}
+            ),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': PostsViewsTests.post_with_group.pk}
+            ),
+        )
+        validators = {}
+        for address in addresses:
+            response = self.client.get(address)
+            self.assertTrue(response.has_header('Last-Modified'))
+            validators[address] = response['ETag']
+            response = self.client.get(
+                address, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+            with self.subTest(address=address):
+                self.assertEqual(response.status_code, 304)
+        self.client.force_login(PostsViewsTests.user)
+        for address, etag in validators.items():
+            with self.subTest(address=address, user='authorized'):
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+        self.client.logout()
+        post = PostsViewsTests.post_with_group
+        post.text = 'Отредактированный текст'
+        post.save()
+        for address, etag in validators.items():
+            with self.subTest(address=address, changed=True):
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_search_finds_word_forms(self):
+        """
+        Search matches other forms of the words, ignores stop words of
+        the query and drops deleted posts
+        """
+        post = Post.objects.create(
+            text='Прогулки по старому городу',
+            author=PostsViewsTests.author
+        )
+        address = reverse('posts:search')
+        for query in (
+            'прогулка по городу', 'прогулка в городе', 'город и прогулка'
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(address, {'q': query})
+                self.assertEqual(
+                    [found.pk for found in response.context['page_obj']],
+                    [post.pk]
+                )
+        post.delete()
+        response = self.client.get(address, {'q': 'прогулка в городе'})
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_search_cursor_pagination(self):
+        """
+        Search results follow each other by cursor keeping the query
+        """
+        Post.objects.bulk_create([
+            Post(text=f'Набережная номер {number}', author=self.author)
+            for number in range(15)
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+        address = reverse('posts:search')
+        response = self.client.get(address, {'q': 'набережные'})
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertContains(response, 'q=%D0%BD%D0%B0%D0%B1')
+        response = self.client.get(
+            address, {'q': 'набережные', 'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 5)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            {post.pk for post in first_page}
+            | {post.pk for post in second_page},
+            set(
+                Post.objects.filter(text__startswith='Набережная')
+                .values_list('pk', flat=True)
+            )
+        )
+
     def test_guest_client_not_following_author(self):
         """
         Guest user can't following author
@@ -293,6 +500,110 @@ class PostsViewsTests(TestCase):
                 self.assertEqual(value, expected)
         Post.objects.filter(pk=new_post.pk).delete()
 
+    def test_follow_feed_fan_out(self):
+        """
+        New post is delivered to followers timelines only
+        """
+        new_post = Post.objects.create(
+            text='Тестовый текст',
+            author=PostsViewsTests.author
+        )
+        self.assertTrue(
+            FeedEntry.objects.filter(
+                user=PostsViewsTests.follower, post=new_post
+            ).exists()
+        )
+        self.assertFalse(
+            FeedEntry.objects.filter(
+                user=PostsViewsTests.user, post=new_post
+            ).exists()
+        )
+
+    def test_follow_feed_follow_and_unfollow(self):
+        """
+        Following backfills the timeline, unfollowing clears it
+        """
+        self.client.force_login(PostsViewsTests.user)
+        self.client.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': PostsViewsTests.author.username}
+            )
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['page_obj'][0].pk, self.last_post_author.pk
+        )
+        self.client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': PostsViewsTests.author.username}
+            )
+        )
+        self.assertFalse(
+            FeedEntry.objects.filter(user=PostsViewsTests.user).exists()
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_follow_feed_heavy_author_fan_out_on_read(self):
+        """
+        Posts of authors with many followers are merged into feed on read
+        """
+        cache.clear()
+        self.client.force_login(PostsViewsTests.follower)
+        new_post = Post.objects.create(
+            text='Тестовый текст',
+            author=PostsViewsTests.author
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertFalse(FeedEntry.objects.filter(post=new_post).exists())
+        self.assertEqual(response.context['page_obj'][0].pk, new_post.pk)
+        cache.clear()
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_follow_feed_backfilled_when_author_not_heavy(self):
+        """
+        Posts written while the author was heavy stay in the feed after
+        the author stops counting as heavy
+        """
+        cache.clear()
+        new_post = Post.objects.create(
+            text='Тестовый текст',
+            author=PostsViewsTests.author
+        )
+        self.assertFalse(FeedEntry.objects.filter(post=new_post).exists())
+        self.client.force_login(PostsViewsTests.follower)
+        with self.settings(FEED_FANOUT_LIMIT=1000):
+            tiered_cache.delete(HEAVY_AUTHORS_KEY)
+            response = self.client.get(reverse('posts:follow_index'))
+        self.assertTrue(FeedEntry.objects.filter(post=new_post).exists())
+        self.assertEqual(response.context['page_obj'][0].pk, new_post.pk)
+        cache.clear()
+
+    def test_rebuild_feeds_command(self):
+        """
+        Timelines are rebuilt from subscriptions, entries of authors
+        no longer followed are dropped
+        """
+        FeedEntry.objects.all().delete()
+        FeedEntry.objects.create(
+            user=PostsViewsTests.user, post=PostsViewsTests.post,
+            pub_date=PostsViewsTests.post.pub_date
+        )
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(
+            FeedEntry.objects.filter(user=PostsViewsTests.follower).count(),
+            Post.objects.filter(author=PostsViewsTests.author).count()
+        )
+        self.assertFalse(
+            FeedEntry.objects.filter(user=PostsViewsTests.user).exists()
+        )
+        with self.settings(FEED_BACKFILL_LIMIT=1):
+            call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(
+            FeedEntry.objects.filter(user=PostsViewsTests.follower).count(), 1
+        )
+
     def test_follow_index_show_correct_context_not_following(self):
         """
         Follow index page show correct context
@@ -434,22 +745,57 @@ class PostsViewsTests(TestCase):
         Post with group field exist in index page
         """
 
-        number_pages = Post.objects.all().count() // 10
-        for page in range(number_pages):
-            response = self.client.get(
-                reverse('posts:index'),
-                {'page': page}
-            )
+        post_exist = False
+        params = {}
+        while True:
+            response = self.client.get(reverse('posts:index'), params)
             page_obj = response.context['page_obj']
-            post_exist = False
-            for post in page_obj:
-                if post.pk == PostsViewsTests.post_with_group.pk:
-                    post_exist = True
-                    break
-            if post_exist:
+            if PostsViewsTests.post_with_group.pk in [
+                post.pk for post in page_obj
+            ]:
+                post_exist = True
+                break
+            if not page_obj.has_next():
                 break
+            params = {'cursor': page_obj.next_cursor}
         self.assertEqual(post_exist, True)
 
+    def test_index_cursor_pagination(self):
+        """
+        Index pages follow each other by cursor without gaps and overlaps
+        """
+        address = reverse('posts:index')
+        response = self.client.get(address)
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        response = self.client.get(
+            address, {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(
+            [post.pk for post in first_page]
+            + [post.pk for post in second_page],
+            expected
+        )
+        self.assertFalse(second_page.has_next())
+        response = self.client.get(
+            address, {'cursor': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in first_page]
+        )
+        response = self.client.get(address, {'cursor': 'broken'})
+        self.assertEqual(
+            response.context['page_obj'][0].pk, first_page[0].pk
+        )
+
     def test_post_with_group_exist_in_group_posts(self):
         """
         Post with group wild exist in group posts page
@@ -479,17 +825,143 @@ class PostsViewsTests(TestCase):
         """
         Post with group field exist in profile page
         """
+        cache.clear()
         address = reverse(
             'posts:profile',
             kwargs={'username': PostsViewsTests.author.username}
         )
         response = self.client.get(address)
-        post_list = response.context['post_list']
-        post_exist = False
-        for post in post_list:
-            if post.pk == PostsViewsTests.post_with_group.pk:
-                post_exist = True
-                break
-            if post_exist:
-                break
-        self.assertEqual(post_exist, True)
+        post_ids = [post.pk for post in response.context['page_obj']]
+        next_cursor = response.context['page_obj'].next_cursor
+        while next_cursor:
+            response = self.client.get(
+                reverse(
+                    'posts:profile_posts',
+                    kwargs={'username': PostsViewsTests.author.username}
+                ),
+                {'cursor': next_cursor}
+            )
+            post_ids.extend(post.pk for post in response.context['page_obj'])
+            next_cursor = response.context['page_obj'].next_cursor
+        self.assertIn(PostsViewsTests.post_with_group.pk, post_ids)
+        self.assertEqual(len(post_ids), self.number_posts)
+
+    def test_profile_renders_one_page(self):
+        """
+        Profile renders a single page and links the next posts
+        """
+        cache.clear()
+        address = reverse(
+            'posts:profile',
+            kwargs={'username': PostsViewsTests.author.username}
+        )
+        response = self.client.get(address)
+        self.assertNotIn('post_list', response.context)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        next_url = (
+            reverse(
+                'posts:profile_posts',
+                kwargs={'username': PostsViewsTests.author.username}
+            )
+            + '?cursor=' + response.context['page_obj'].next_cursor
+        )
+        self.assertContains(response, f'data-next-page="{next_url}"')
+        # Cached posts fragment is rendered without querying posts
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(address)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'FROM "posts_post"' in query['sql']
+        ])
+
+    def test_profile_posts_json(self):
+        """
+        Infinite scroll endpoint returns the next posts as JSON
+        """
+        cache.clear()
+        address = reverse(
+            'posts:profile_posts',
+            kwargs={'username': PostsViewsTests.author.username}
+        )
+        first = self.client.get(address, {'format': 'json'}).json()
+        self.assertIn(
+            reverse('posts:post_detail', args=(self.last_post_author.pk,)),
+            first['html']
+        )
+        second = self.client.get(
+            address, {'format': 'json', 'cursor': first['next_cursor']}
+        ).json()
+        self.assertIsNone(second['next_cursor'])
+        self.assertNotIn('data-next-page', second['html'])
+
+    def test_cached_fragments_skip_post_queries(self):
+        """
+        Feeds served from the fragment cache do not read posts
+        """
+        self.client.force_login(PostsViewsTests.follower)
+        addresses = (
+            reverse('posts:index'),
+            reverse(
+                'posts:group_posts',
+                kwargs={'slug': PostsViewsTests.group.slug}
+            ),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                cache.clear()
+                cards = self.client.get(address).content.count(b'<article>')
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(address)
+                self.assertGreater(cards, 0)
+                self.assertEqual(
+                    response.content.count(b'<article>'), cards
+                )
+                self.assertFalse([
+                    query for query in queries.captured_queries
+                    if 'FROM "posts_post"' in query['sql']
+                ])
+
+    def test_pages_number_queries_not_depend_on_number_posts(self):
+        """
+        Pages fetch authors, groups and comments without N+1 queries
+        """
+        # 15 posts of one author with group and 6 comments
+        # cost as many queries as a single one, group, profile and post
+        # pages look up their object once more for conditional GET
+        self.client.force_login(PostsViewsTests.follower)
+        Comment.objects.bulk_create([
+            Comment(
+                text='Тестовый комментарий',
+                post=PostsViewsTests.post,
+                author=PostsViewsTests.user
+            ) for i in range(5)
+        ])
+        pages_max_queries = {
+            reverse('posts:index'): 3,
+            reverse(
+                'posts:group_posts',
+                kwargs={'slug': PostsViewsTests.group.slug}
+            ): 5,
+            reverse(
+                'posts:profile',
+                kwargs={'username': PostsViewsTests.author.username}
+            ): 7,
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': PostsViewsTests.post.pk}
+            ): 6,
+            reverse('posts:follow_index'): 4,
+        }
+        for address, max_queries in pages_max_queries.items():
+            with self.subTest(address=address):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(address)
+                # sorl.thumbnail key-value store writes and lookups
+                # are per image file, not per post
+                queries = [
+                    query for query in queries.captured_queries
+                    if query['sql'].startswith('SELECT')
+                    and 'thumbnail_kvstore' not in query['sql']
+                ]
+                self.assertLessEqual(len(queries), max_queries)
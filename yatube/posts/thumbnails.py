@@ -0,0 +1,77 @@
+"""
+Thumbnail pre-generation.
+
+Every variant of a post image (``POST_IMAGE_WIDTHS`` in each of
+``POST_IMAGE_FORMATS``) is rendered by a local worker pool right after
+the image is saved, so templates only hit the ``sorl.thumbnail``
+key-value store and never resize images in a request. Pages asking for
+variants not rendered yet schedule them again.
+"""
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+SCHEDULED_KEY = 'thumbnails_scheduled:{}'
+# Seconds a missing variant is not scheduled again while it renders
+SCHEDULE_INTERVAL = 60
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS,
+    thread_name_prefix='thumbnails'
+)
+
+
+Variant = namedtuple('Variant', 'format width height geometry options')
+
+
+def variants():
+    """Thumbnail variants of post images grouped by format."""
+    ratio_width, ratio_height = settings.POST_IMAGE_RATIO
+    for image_format in settings.POST_IMAGE_FORMATS:
+        for width in settings.POST_IMAGE_WIDTHS:
+            height = round(width * ratio_height / ratio_width)
+            yield Variant(
+                image_format, width, height, f'{width}x{height}',
+                {
+                    'crop': 'center',
+                    'upscale': True,
+                    'format': image_format,
+                    'quality': settings.POST_IMAGE_QUALITY,
+                }
+            )
+
+
+def generate_thumbnails(image):
+    """Render every variant of the image."""
+    for variant in variants():
+        get_thumbnail(image, variant.geometry, **variant.options)
+
+
+def generate_in_worker(image):
+    try:
+        generate_thumbnails(image)
+    except Exception:
+        logger.exception('Thumbnails of %s are not generated', image)
+    finally:
+        connections.close_all()
+
+
+def schedule_thumbnails(image):
+    """Generate thumbnails in the pool once the transaction commits."""
+    if image:
+        transaction.on_commit(
+            lambda: executor.submit(generate_in_worker, image)
+        )
+
+
+def schedule_missing(image):
+    """Schedule variants a page asked for, once per interval."""
+    if cache.add(SCHEDULED_KEY.format(image.name), True, SCHEDULE_INTERVAL):
+        schedule_thumbnails(image)
@@ -1,16 +1,74 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
 
-from posts.forms import CommentForm, PostForm
-from posts.models import Comment, Follow, Group, Like, Post, User
+from core.cache import namespace
+from core.conditional import versioned_page
+from core.page_cache import anonymous_page
+from core.paginator import KeysetPaginator
+from posts.feed import FOLLOW_FEED_KEYS, author_feed, follow_feed
+from posts.forms import IMAGE_DIMENSION_FIELDS, CommentForm, PostForm
+from posts.likes import toggle_like
+from posts.models import Comment, Follow, Group, Post, User
+from posts.search import SearchPaginator
+from posts.stats import get_stats
+from posts.thumbnails import schedule_thumbnails
 
 
+def index_namespaces(request):
+    return ['index']
+
+
+def group_namespaces(request, slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    )
+    if group_id is None:
+        return None
+    return [namespace('group', group_id)]
+
+
+def profile_namespaces(request, username):
+    author_id = (
+        User.objects.filter(username=username)
+        .values_list('pk', flat=True).first()
+    )
+    if author_id is None:
+        return None
+    namespaces = [namespace('author', author_id)]
+    if request.user.is_authenticated:
+        # Follow button
+        namespaces.append(namespace('follow', request.user.pk))
+    return namespaces
+
+
+def post_namespaces(request, post_id):
+    post = (
+        Post.objects.filter(pk=post_id)
+        .values_list('author_id', 'group_id').first()
+    )
+    if post is None:
+        return None
+    author_id, group_id = post
+    namespaces = [
+        namespace('author', author_id), namespace('comments', post_id)
+    ]
+    if group_id is not None:
+        namespaces.append(namespace('group', group_id))
+    return namespaces
+
+
+@versioned_page(index_namespaces)
+@anonymous_page(index_namespaces)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    paginator = KeysetPaginator(post_list, 10)
+    cursor = request.GET.get('cursor')
+    # Evaluated only when the cached page fragment is missing
+    page_obj = SimpleLazyObject(lambda: paginator.get_page(cursor))
     template = 'posts/index.html'
     context = {
         'title': 'Главная страница',
@@ -19,12 +77,15 @@ def index(request):
     return render(request, template, context)
 
 
+@versioned_page(group_namespaces)
+@anonymous_page(group_namespaces)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed().filter(group=group)
+    paginator = KeysetPaginator(post_list, 10)
+    cursor = request.GET.get('cursor')
+    # Evaluated only when the cached page fragment is missing
+    page_obj = SimpleLazyObject(lambda: paginator.get_page(cursor))
     template = 'posts/group_list.html'
     context = {
         'title': group.title,
@@ -36,12 +97,13 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@versioned_page(profile_namespaces)
+@anonymous_page(profile_namespaces)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=author)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    cursor = request.GET.get('cursor')
+    # Evaluated only when the cached posts fragment is missing
+    page_obj = SimpleLazyObject(lambda: author_feed(author, cursor))
     template = 'posts/profile.html'
     following = (
         request.user.is_authenticated
@@ -50,20 +112,53 @@ def profile(request, username):
         'title': 'Профиль пользователя',
         'author': author,
         'page_obj': page_obj,
-        'number_posts': post_list.count(),
-        'post_list': post_list,
+        'number_posts': get_stats(author).posts_count,
         'following': following
     }
     return render(request, template, context)
 
 
+def profile_posts(request, username):
+    """Next posts of the profile for infinite scroll."""
+    author = get_object_or_404(User, username=username)
+    page_obj = author_feed(author, request.GET.get('cursor'))
+    context = {
+        'author': author,
+        'page_obj': page_obj,
+    }
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'html': render_to_string(
+                'includes/profile_posts.html', context, request
+            ),
+            'next_cursor': page_obj.next_cursor,
+        })
+    return render(request, 'includes/profile_posts.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(query, 10)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    template = 'posts/search.html'
+    context = {
+        'title': 'Поиск',
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@versioned_page(post_namespaces)
+@anonymous_page(post_namespaces)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    number_posts = Post.objects.filter(author=post.author).count()
-    comments_list = Comment.objects.filter(post=post)
-    paginator = Paginator(comments_list, 5)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    number_posts = get_stats(post.author).posts_count
+    comments_list = Comment.objects.for_display().filter(post=post)
+    paginator = KeysetPaginator(comments_list, 5)
+    cursor = request.GET.get('cursor')
+    # Evaluated only when the cached comments fragment is missing
+    page_obj = SimpleLazyObject(lambda: paginator.get_page(cursor))
     form = CommentForm()
     template = 'posts/post_detail.html'
     context = {
@@ -88,6 +183,7 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            schedule_thumbnails(post.image)
             return redirect('posts:profile', post.author.username)
     form = PostForm()
     template = 'posts/create_post.html'
@@ -110,7 +206,14 @@ def post_edit(request, post_id):
             files=request.FILES or None,
             instance=post)
         if form.is_valid():
-            form.save()
+            post = form.save(commit=False)
+            # Counters updated since the post was read are not written back
+            fields = list(form.changed_data)
+            if 'image' in fields:
+                fields.extend(IMAGE_DIMENSION_FIELDS)
+            post.save(update_fields=fields)
+            if 'image' in form.changed_data:
+                schedule_thumbnails(post.image)
         return redirect('posts:post_detail', post_id=post.pk)
     template = 'posts/create_post.html'
     context = {
@@ -128,17 +231,18 @@ def add_comment(request, post_id):
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = get_object_or_404(Post, pk=post_id)
-        comment.save()
+        comment.post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+        # The comment and the comments counter of the post change together
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = follow_feed(request.user).for_feed()
+    paginator = KeysetPaginator(post_list, 10, keys=FOLLOW_FEED_KEYS)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     template = 'posts/follow.html'
     context = {
         'title': 'Избранные авторы',
@@ -168,14 +272,8 @@ def profile_unfollow(request, username):
 @login_required
 def post_like_or_unlike(request, post_id):
     referer = request.META.get('HTTP_REFERER')
-    post = get_object_or_404(Post, id=post_id)
-    if Like.objects.filter(user=request.user, post=post).exists():
-        like = Like.objects.get(user=request.user, post=post)
-        like.delete()
-        post.likes -= 1
-        post.save()
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    toggle_like(request.user, post.pk)
+    if referer:
         return redirect(referer)
-    Like.objects.create(user=request.user, post=post)
-    post.likes += 1
-    post.save()
-    return redirect(referer)
+    return redirect('posts:post_detail', post_id=post_id)
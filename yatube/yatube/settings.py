@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+from PIL import features
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -41,6 +44,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -51,6 +55,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,7 +72,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.InstrumentedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -86,12 +94,56 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# Configured from the environment, SQLite in the project directory
+# by default. DB_REPLICA_HOSTS lists comma separated read replicas of
+# the primary server, they serve reads of safe requests.
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
+
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.getenv(
+                'DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+            ),
+            'OPTIONS': {
+                # Seconds a writer waits for the lock, sqlite3 busy timeout
+                'timeout': int(os.getenv('DB_SQLITE_TIMEOUT', 20)),
+            },
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.getenv('DB_NAME', 'yatube'),
+            'USER': os.getenv('DB_USER', 'yatube'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        }
+    }
+    for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1
+    ):
+        DATABASES[f'replica_{number}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['core.db.PrimaryReplicaRouter']
+
+# Safe requests of a client read from the primary for this many seconds
+# after its last write, so it sees its own changes despite replica lag
+DB_REPLICA_LAG = int(os.getenv('DB_REPLICA_LAG', 5))
+
+# SQLite runs in write-ahead log mode: readers do not block the writer
+DB_SQLITE_WAL = os.getenv('DB_SQLITE_WAL', '1') == '1'
 
 
 # Password validation
@@ -131,7 +183,19 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
-STATICFILES_DIRS = [os.path.join(BASE_DIR), 'static']
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Content-hashed names and .gz/.br copies, written by collectstatic
+STATICFILES_STORAGE = 'core.static.CompressedManifestStaticFilesStorage'
+
+# STATIC_ROOT is served by core.middleware.StaticFilesMiddleware, turn it
+# off when a front proxy serves it. Seconds browsers cache hashed names
+# and names without a hash
+STATIC_SERVE = True
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+STATIC_UNHASHED_MAX_AGE = 60 * 60
 
 LOGIN_URL = 'users:login'
 
@@ -147,8 +211,118 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Shared by all worker processes: version tokens, locks taken with
+# cache.add and counters of LIKES_BUFFER_SHARDS need a backend whose
+# add and incr are atomic across processes. Redis is used outside DEBUG
+# (requires django-redis), CACHE_BACKEND and CACHE_LOCATION override
+# the backend. The development server runs a single process and keeps
+# the cache in memory, tests override it in yatube.test_settings.
+# Namespace versions, fragments, pages and thumbnail keys share the
+# cache: Django's default of 300 entries would cull versions at random
+# and empty the caches depending on them.
+SHARED_CACHE_BACKENDS = (
+    'django_redis.cache.RedisCache',
+    'django.core.cache.backends.memcached.MemcachedCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 100000))
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache' if DEBUG
+            else SHARED_CACHE_BACKENDS[0]
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', '' if DEBUG else 'redis://127.0.0.1:6379/1'
+        ),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
     }
 }
+
+# Worker processes serving requests, as gunicorn reads it
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+
+if (WEB_CONCURRENCY > 1
+        and CACHES['default']['BACKEND'] not in SHARED_CACHE_BACKENDS):
+    raise ImproperlyConfigured(
+        'Several workers need a shared cache with atomic add and incr, '
+        'set CACHE_BACKEND to one of ' + ', '.join(SHARED_CACHE_BACKENDS)
+    )
+
+# In-process tier of core.tiered: number of entries and seconds they are
+# served without asking the shared cache, 0 turns the tier off
+LOCAL_CACHE_SIZE = 1024
+LOCAL_CACHE_TIMEOUT = 5
+
+# Seconds whole pages are cached for visitors without a session, 0 disables
+ANONYMOUS_PAGE_TIMEOUT = 60 * 10
+
+# Follow feed: authors with more followers are merged into feeds on read
+FEED_FANOUT_LIMIT = 1000
+
+# Latest posts of an author copied into a timeline on follow
+FEED_BACKFILL_LIMIT = 500
+
+# Entries written per insert of a backfill, posts read per chunk by
+# rebuild_feeds
+FEED_BATCH_SIZE = 1000
+
+# Shards of cache buffered like counters flushed by flush_likes, 0 disables
+LIKES_BUFFER_SHARDS = 0
+
+# Dotted path of the post search backend, None picks one for the database
+POSTS_SEARCH_BACKEND = None
+
+# Responsive variants of post images pre-generated on upload: widths of
+# a crop of POST_IMAGE_RATIO in every format, the last format is the
+# fallback for browsers supporting none of the others
+POST_IMAGE_RATIO = (960, 339)
+POST_IMAGE_WIDTHS = (480, 720, 960)
+POST_IMAGE_FORMATS = (
+    ('WEBP',) if features.check('webp') else ()
+) + ('JPEG',)
+# Rendered width of post images for the browser to pick a variant
+POST_IMAGE_SIZES = '(min-width: 992px) 960px, 100vw'
+
+THUMBNAIL_WORKERS = 2
+
+THUMBNAIL_BACKEND = 'core.thumbnails.ThumbnailBackend'
+
+# Thumbnail store on disk: least recently used files are evicted above
+# the cap in bytes, except files used within MIN_AGE seconds which cached
+# pages may link to. Use is recorded at most every TOUCH_INTERVAL seconds.
+# A store over the cap with nothing evictable is scanned again once it
+# grows by RESCAN_BYTES
+THUMBNAIL_STORE_MAX_BYTES = int(
+    os.getenv('THUMBNAIL_STORE_MAX_BYTES', 2 * 1024 ** 3)
+)
+THUMBNAIL_STORE_RESCAN_BYTES = 64 * 1024 ** 2
+THUMBNAIL_STORE_MIN_AGE = 60 * 60 * 24
+THUMBNAIL_TOUCH_INTERVAL = 60 * 60
+
+# Uploaded post images are downscaled to this longest side in pixels and
+# re-encoded, 'WEBP' needs Pillow built with libwebp
+POST_IMAGE_MAX_SIZE = 1920
+POST_IMAGE_FORMAT = 'JPEG'
+POST_IMAGE_QUALITY = 82
+
+# Uploads are streamed to temporary files instead of memory
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Request timings are sent in the Server-Timing header, they describe
+# internal queries and are not shown in production
+SERVER_TIMING = DEBUG
+
+# /metrics is read by staff users and by scrapers sending the token as
+# "Authorization: Bearer <token>". Allowed addresses must not include
+# the address of a reverse proxy, all requests behind it come from there
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = ()
+
+# JSON API: default and largest page, rows fetched per query on export
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+API_EXPORT_CHUNK_SIZE = 2000
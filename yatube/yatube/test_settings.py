@@ -0,0 +1,15 @@
+"""
+Settings of test runs, used by ``manage.py test`` and pytest.
+"""
+from yatube.settings import *  # noqa: F401,F403
+
+# Cleared between tests, the whole suite runs in one process
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+# Tests read what they have just written to the shared cache
+LOCAL_CACHE_TIMEOUT = 0